@@ -0,0 +1,307 @@
+# benchmark.py
+# Per-stage latency, throughput and memory of the robot pipeline, e.g.
+#   python benchmark.py --output results.json
+#   python benchmark.py --replay recordings/run1 --baseline baseline.json
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import platform
+import resource
+import sys
+import time
+from datetime import datetime, timezone
+from importlib import metadata
+
+import cv2
+import numpy as np
+
+TRACKED_PACKAGES = ("ultralytics", "transformers", "deep_sort_realtime", "torch", "onnxruntime", "numpy", "opencv-python")
+LABELS = ("person", "car", "bicycle", "dog")
+ORIGIN = (36.8065, 10.1815, 10.0)
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def package_versions():
+    versions = {}
+    for name in TRACKED_PACKAGES:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+def synthetic_frames(count, width, height, seed=0):
+    # Moving shapes over a gradient so detectors, trackers and motion checks see some structure
+    rng = np.random.default_rng(seed)
+    base = np.tile(np.linspace(40, 200, width, dtype=np.uint8), (height, 1))
+    base = cv2.merge([base, base[::-1], np.full_like(base, 90)])
+    shapes = [(rng.integers(0, width - 80), rng.integers(0, height - 120), tuple(int(c) for c in rng.integers(0, 255, 3)))
+              for _ in range(4)]
+    frames = []
+    for i in range(count):
+        frame = base.copy()
+        for x, y, color in shapes:
+            x = int((x + 6 * i) % (width - 80))
+            cv2.rectangle(frame, (x, y), (x + 60, y + 110), color, -1)
+        frames.append(frame)
+    return frames, [None] * count, None
+
+
+def replay_frames(directory, count):
+    from sensor_recording import ReplayCamera, ReplayClock
+
+    camera = ReplayCamera(directory, clock=ReplayClock(realtime=False))
+    frames, depths = [], []
+    while len(frames) < count:
+        frame, depth = camera.get_frame()
+        if frame is None:
+            break
+        frames.append(np.array(frame))
+        depths.append(np.array(depth) if depth is not None else None)
+    return frames, depths, camera
+
+
+def synthetic_detections(frame, index, n=5):
+    h, w = frame.shape[:2]
+    rng = np.random.default_rng(index // 10)
+    detections = []
+    for k in range(n):
+        x1 = int(rng.integers(0, w - 100)) + index % 10
+        y1 = int(rng.integers(0, h - 150))
+        x2, y2 = x1 + 80, y1 + 130
+        detections.append({"id": -1, "label": LABELS[k % len(LABELS)], "confidence": 0.8,
+                           "bbox": (x1, y1, x2, y2), "center": ((x1 + x2) // 2, (y1 + y2) // 2)})
+    return detections
+
+
+def objects_for(detections, index):
+    timestamp = datetime.fromtimestamp(1.7e9 + index / 30.0, timezone.utc).isoformat()
+    objects = [{"id": "robot", "label": "robot", "lat": ORIGIN[0], "lon": ORIGIN[1], "altitude": ORIGIN[2],
+                "timestamp": timestamp}]
+    for k, det in enumerate(detections):
+        x1, y1, _, _ = det["bbox"]
+        objects.append({"id": str(k + 1), "label": det["label"], "lat": ORIGIN[0] + y1 * 1e-7,
+                        "lon": ORIGIN[1] + x1 * 1e-7, "altitude": ORIGIN[2], "timestamp": timestamp})
+    return objects
+
+
+class StageRunner:
+    def __init__(self, runs, warmup):
+        self.runs = runs
+        self.warmup = warmup
+        self.results = {}
+
+    def run(self, name, setup, count):
+        # setup() returns fn(i) or raises ImportError/RuntimeError when the stage cannot run here
+        rss_before = peak_rss_mb()
+        try:
+            fn = setup()
+        except Exception as e:
+            self.results[name] = {"skipped": f"{type(e).__name__}: {e}"}
+            print(f"[Benchmark] {name}: skipped ({e})")
+            return
+
+        for i in range(min(self.warmup, count)):
+            fn(i)
+        latencies = []
+        start = time.perf_counter()
+        for i in range(self.runs):
+            t0 = time.perf_counter()
+            fn(i % count)
+            latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - start
+
+        ms = np.array(latencies) * 1000
+        self.results[name] = {
+            "runs": self.runs,
+            "mean_ms": float(ms.mean()),
+            "p50_ms": float(np.percentile(ms, 50)),
+            "p95_ms": float(np.percentile(ms, 95)),
+            "p99_ms": float(np.percentile(ms, 99)),
+            "throughput_per_s": self.runs / elapsed if elapsed > 0 else None,
+            # The process high-water mark only rises, so a stage is charged with how far it raised it;
+            # 0 means it stayed under a peak set earlier. Whole-run peak_rss_mb is in the top level.
+            "peak_rss_growth_mb": peak_rss_mb() - rss_before,
+        }
+        r = self.results[name]
+        print(f"[Benchmark] {name}: p50 {r['p50_ms']:.2f} ms, p95 {r['p95_ms']:.2f} ms, "
+              f"p99 {r['p99_ms']:.2f} ms, {r['throughput_per_s']:.1f}/s, peak RSS +{r['peak_rss_growth_mb']:.0f} MB")
+
+
+def compare(results, baseline, tolerance, min_delta_ms=0.5):
+    # A stage regresses only when p95 is both tolerance slower and min_delta_ms slower in absolute terms;
+    # sub-millisecond stages jitter far beyond any relative tolerance between identical runs
+    regressions = []
+    for name, current in results["stages"].items():
+        previous = baseline.get("stages", {}).get(name)
+        if not previous or "p95_ms" not in previous or "p95_ms" not in current:
+            continue
+        ratio = current["p95_ms"] / previous["p95_ms"] if previous["p95_ms"] else 1.0
+        delta = current["p95_ms"] - previous["p95_ms"]
+        status = "REGRESSION" if ratio > 1 + tolerance and delta > min_delta_ms else "ok"
+        print(f"[Baseline] {name}: p95 {previous['p95_ms']:.2f} -> {current['p95_ms']:.2f} ms ({ratio:.2f}x) {status}")
+        if status != "ok":
+            regressions.append(name)
+
+    changed = {k: (v, results["meta"]["versions"].get(k))
+               for k, v in baseline.get("meta", {}).get("versions", {}).items()
+               if results["meta"]["versions"].get(k) != v}
+    for name, (old, new) in changed.items():
+        print(f"[Baseline] {name}: {old} -> {new}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the robot pipeline stage by stage")
+    parser.add_argument("--replay", help="Recording directory to use instead of synthetic frames")
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--tracker", default="deepsort")
+    parser.add_argument("--stages", nargs="*", help="Only run these stages")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--baseline", help="Compare p95 latencies against this results file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative p95 slowdown before failing")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5,
+                        help="Allowed absolute p95 slowdown before failing; both limits must be exceeded")
+    args = parser.parse_args()
+
+    if args.replay:
+        frames, depths, camera = replay_frames(args.replay, args.frames)
+    else:
+        frames, depths, camera = synthetic_frames(args.frames, args.width, args.height)
+    if not frames:
+        raise SystemExit("No frames to benchmark.")
+    count = len(frames)
+
+    runner = StageRunner(args.runs, args.warmup)
+    wanted = lambda name: not args.stages or name in args.stages
+
+    # Later stages consume earlier outputs; synthetic stand-ins keep them runnable when a model is missing
+    detections = [synthetic_detections(frame, i) for i, frame in enumerate(frames)]
+    depth_maps = [None] * count
+
+    def setup_detect():
+        from object_detection import detect_objects, get_model
+        get_model()
+
+        def run(i):
+            found = detect_objects(frames[i], track=False)
+            if found:
+                detections[i] = found
+        return run
+
+    def setup_track():
+        from tracking import create_tracker
+        tracker = create_tracker(args.tracker)
+        return lambda i: tracker.update(detections[i], frame=frames[i])
+
+    def setup_depth():
+        from depth_estimation import estimate_depth_map, load_model
+        load_model()
+
+        def run(i):
+            depth_maps[i] = estimate_depth_map(frames[i])
+        return run
+
+    def setup_roi_depth():
+        boxes = lambda i: [d["bbox"] for d in detections[i]]
+        if depths[0] is not None and camera is not None:
+            from depth_camera import compute_roi_depths
+            return lambda i: compute_roi_depths(
+                depths[i], camera.map_boxes_to_depth(boxes(i), frames[i].shape[:2], depths[i].shape[:2]),
+                camera.depth_scale)
+
+        from depth_sampling import box_depth_stats
+        fallback = np.random.default_rng(0).uniform(0.5, 8.0, (256, 256)).astype(np.float32)
+        return lambda i: box_depth_stats(depth_maps[i] if depth_maps[i] is not None else fallback,
+                                         boxes(i), frame_shape=frames[i].shape[:2])
+
+    def setup_geo():
+        from depth_camera import calculate_bearings, calculate_elevations, project_to_gps
+        h, w = frames[0].shape[:2]
+        f = 0.5 * w / np.tan(np.radians(34.5))
+
+        def run(i):
+            boxes = np.array([d["bbox"] for d in detections[i]], dtype=np.float64).reshape(-1, 4)
+            distances = np.linspace(1.0, 8.0, len(boxes))
+            project_to_gps(ORIGIN[0], ORIGIN[1], distances,
+                           calculate_bearings((boxes[:, 0] + boxes[:, 2]) / 2, f, w / 2, 0),
+                           alt_1=ORIGIN[2], elevations=calculate_elevations((boxes[:, 1] + boxes[:, 3]) / 2, f, h / 2))
+        return run
+
+    def setup_geojson():
+        from object_geojson import create_geojson
+        objects = [objects_for(detections[i], i) for i in range(count)]
+        return lambda i: json.dumps(create_geojson(objects[i]))
+
+    def setup_emit():
+        from socket_server import FORMATS, SocketServer
+        server = SocketServer()
+        for fmt in FORMATS:
+            server.subscribers[fmt].add(f"bench-{fmt}")
+        objects = [objects_for(detections[i], i) for i in range(count)]
+        loop = asyncio.new_event_loop()
+
+        def run(i):
+            # Encodes every format and goes through AsyncServer.emit, without network I/O
+            with contextlib.redirect_stdout(io.StringIO()):
+                loop.run_until_complete(server._emit_objects(objects[i]))
+        return run
+
+    stages = [
+        ("detect", setup_detect),
+        ("track", setup_track),
+        ("depth", setup_depth),
+        ("roi_depth", setup_roi_depth),
+        ("geo_projection", setup_geo),
+        ("geojson", setup_geojson),
+        ("socket_emit", setup_emit),
+    ]
+    for name, setup in stages:
+        if wanted(name):
+            runner.run(name, setup, count)
+
+    results = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "source": args.replay or "synthetic",
+            "frames": count,
+            "frame_shape": list(frames[0].shape),
+            "runs": args.runs,
+            "versions": package_versions(),
+        },
+        "stages": runner.results,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    print(f"[Benchmark] Peak RSS for the run: {results['peak_rss_mb']:.0f} MB")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[Benchmark] Results written to {args.output}")
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.min_delta_ms)
+        if regressions:
+            raise SystemExit(f"p95 regressions in: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# compare_backends.py
+# Latency and accuracy of the ONNX Runtime backends against the PyTorch reference, e.g.
+#   python compare_backends.py --images samples/*.jpg --runs 20
+
+import argparse
+import glob
+import time
+
+import cv2
+import numpy as np
+
+import depth_estimation
+import object_detection
+from tracking import greedy_iou_match
+
+CONFIGS = [("torch", False), ("onnx", False), ("onnx", True)]
+
+
+def load_frames(patterns, cam_index, count):
+    paths = [p for pattern in patterns for p in sorted(glob.glob(pattern))]
+    if paths:
+        return [frame for frame in (cv2.imread(p) for p in paths) if frame is not None]
+
+    cap = cv2.VideoCapture(cam_index)
+    frames = []
+    while len(frames) < count:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def time_calls(fn, frames, runs):
+    fn(frames[0])
+    latencies, outputs = [], []
+    for i in range(runs):
+        frame = frames[i % len(frames)]
+        start = time.perf_counter()
+        result = fn(frame)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if i < len(frames):
+            outputs.append(result)
+    return np.array(latencies), outputs
+
+
+def detection_agreement(reference, candidate):
+    # Fraction of reference boxes matched by a same-label candidate box at IoU >= 0.5
+    matched = total = 0
+    for ref, cand in zip(reference, candidate):
+        total += len(ref)
+        for label in {d["label"] for d in ref}:
+            ref_boxes = [d["bbox"] for d in ref if d["label"] == label]
+            cand_boxes = [d["bbox"] for d in cand if d["label"] == label]
+            matched += len(greedy_iou_match(ref_boxes, cand_boxes, 0.5))
+    return matched / total if total else 1.0
+
+
+def depth_error(reference, candidate):
+    # Mean absolute relative error; DPT outputs relative depth so both maps are scale-normalized
+    errors = []
+    for ref, cand in zip(reference, candidate):
+        ref = ref / (np.median(ref) or 1.0)
+        cand = cand / (np.median(cand) or 1.0)
+        errors.append(float(np.mean(np.abs(cand - ref) / np.maximum(np.abs(ref), 1e-6))))
+    return float(np.mean(errors)) if errors else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare PyTorch and ONNX Runtime inference backends")
+    parser.add_argument("--images", nargs="*", default=[], help="Image files or globs (default: grab from webcam)")
+    parser.add_argument("--camera", type=int, default=0)
+    parser.add_argument("--frames", type=int, default=10, help="Frames to grab when no images are given")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--skip-depth", action="store_true")
+    args = parser.parse_args()
+
+    frames = load_frames(args.images, args.camera, args.frames)
+    if not frames:
+        raise SystemExit("No frames to compare.")
+
+    ref_detections = ref_depths = None
+    for backend, int8 in CONFIGS:
+        name = backend + (" int8" if int8 else "")
+        try:
+            object_detection.set_backend(backend, int8=int8)
+            latencies, detections = time_calls(lambda f: object_detection.detect_objects(f, track=False),
+                                               frames, args.runs)
+        except Exception as e:
+            print(f"[{name}] detection unavailable: {e}")
+            continue
+        if ref_detections is None:
+            ref_detections = detections
+        print(f"[{name}] detection: mean {latencies.mean():.1f} ms, p95 {np.percentile(latencies, 95):.1f} ms, "
+              f"agreement {detection_agreement(ref_detections, detections) * 100:.1f}%")
+
+        if args.skip_depth:
+            continue
+        try:
+            depth_estimation.set_backend(backend, int8=int8)
+            latencies, depths = time_calls(depth_estimation.estimate_depth_map, frames, args.runs)
+        except Exception as e:
+            print(f"[{name}] depth unavailable: {e}")
+            continue
+        if ref_depths is None:
+            ref_depths = depths
+        print(f"[{name}] depth: mean {latencies.mean():.1f} ms, p95 {np.percentile(latencies, 95):.1f} ms, "
+              f"relative error {depth_error(ref_depths, depths) * 100:.2f}%")
+
+
+if __name__ == "__main__":
+    main()
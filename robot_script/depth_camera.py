@@ -1,30 +1,171 @@
-import pyrealsense2 as rs
+import logging
+import math
+import time
+try:
+    import pyrealsense2 as rs
+except ImportError:
+    # Only needed for a real device; an injected pipeline and config work without the SDK
+    rs = None
 import numpy as np
+from depth_sampling import DEPTH_STATS, box_depth_stats
+from frame_ring import FrameRing
+
+log = logging.getLogger(__name__)
+
+EARTH_RADIUS = 6371008.8
+
+
+def _stream(name):
+    # Stand-in profiles without the SDK are asked for streams by name
+    return getattr(rs.stream, name) if rs is not None else name
  
 class DepthCamera:
-    def __init__(self):
-        self.pipeline = rs.pipeline()
-        self.config = rs.config()
-        self.config.enable_stream(rs.stream.color, 640, 480, rs.format.bgr8, 30)
-        self.config.enable_stream(rs.stream.depth, 640, 480, rs.format.z16, 30)
-        self.align = rs.align(rs.stream.color)
+    ALIGN_MODES = ("color", "depth", "roi", "off")
+
+    def __init__(self, width=640, height=480, fps=30, align="color", decimation=1,
+                 spatial_filter=False, temporal_filter=False, recording=None, pipeline=None,
+                 config=None, align_block=None, depth_filters=None, ring_slots=0):
+        if align not in self.ALIGN_MODES:
+            raise ValueError(f"Unknown align mode '{align}', expected one of {self.ALIGN_MODES}")
+        self.align_mode = align
+        if align == "off":
+            log.warning("REALSENSE_ALIGN=off samples depth at color pixel coordinates without mapping; "
+                        "the color and depth fields of view differ, so distances may come from the wrong object.")
+
+        # Any object with start(config)/wait_for_frames()/stop() can stand in for the device pipeline;
+        # an injected pipeline is started with the injected config as is
+        if pipeline is None:
+            pipeline = rs.pipeline()
+            if config is None:
+                config = rs.config()
+                if recording:
+                    config.enable_device_from_file(recording, repeat_playback=True)
+                config.enable_stream(rs.stream.color, width, height, rs.format.bgr8, fps)
+                config.enable_stream(rs.stream.depth, width, height, rs.format.z16, fps)
+        self.pipeline = pipeline
+        self.config = config
         self.profile = self.pipeline.start(self.config)
+
+        # SDK processing blocks are created on the first frame unless injected (anything with
+        # process(frames)); "roi" and "off" never align the full frame
+        self.decimation = decimation
+        self.spatial_filter = spatial_filter
+        self.temporal_filter = temporal_filter
+        self.align = align_block
+        self.filters = list(depth_filters) if depth_filters is not None else None
+        self._processing_built = False
+        needs_align = align in ("color", "depth") and self.align is None
+        needs_filters = self.filters is None and (decimation > 1 or spatial_filter or temporal_filter)
+        if rs is None and (needs_align or needs_filters):
+            raise RuntimeError(f"pyrealsense2 is required for align='{align}' and depth filters; "
+                               "install it or inject align_block and depth_filters")
  
-        color_profile = self.profile.get_stream(rs.stream.color)
-        self.intr = color_profile.as_video_stream_profile().get_intrinsics()
-        self.f_x, self.c_x = self.intr.fx, self.intr.ppx
+        color_profile = self.profile.get_stream(_stream("color"))
+        depth_profile = self.profile.get_stream(_stream("depth"))
+        self.color_intr = color_profile.as_video_stream_profile().get_intrinsics()
+        self.depth_intr = depth_profile.as_video_stream_profile().get_intrinsics()
+        # With depth alignment the color image is resampled into the depth camera's geometry
+        self._set_intrinsics(self.depth_intr if align == "depth" else self.color_intr)
+        self.depth_scale = self.profile.get_device().first_depth_sensor().get_depth_scale()
+        self._filtered_depth_intr = self.depth_intr
+
+        # ring_slots > 0 copies each color frame once into shared memory for worker processes
+        self.ring_slots = ring_slots
+        self.ring = None
+        self.last_timestamp = None
  
+    def _set_intrinsics(self, intr):
+        self.intr = intr
+        self.f_x, self.c_x = intr.fx, intr.ppx
+        self.f_y, self.c_y = intr.fy, intr.ppy
+        self.bearing_table = build_bearing_table(intr)
+
+    def _build_processing(self):
+        if self.align is None and self.align_mode == "color":
+            self.align = rs.align(rs.stream.color)
+        elif self.align is None and self.align_mode == "depth":
+            self.align = rs.align(rs.stream.depth)
+        if self.filters is not None:
+            return
+
+        self.filters = []
+        if self.decimation > 1:
+            decimation_filter = rs.decimation_filter()
+            decimation_filter.set_option(rs.option.filter_magnitude, self.decimation)
+            self.filters.append(decimation_filter)
+        if self.spatial_filter or self.temporal_filter:
+            self.filters.append(rs.disparity_transform(True))
+            if self.spatial_filter:
+                self.filters.append(rs.spatial_filter())
+            if self.temporal_filter:
+                self.filters.append(rs.temporal_filter())
+            self.filters.append(rs.disparity_transform(False))
+
     def get_frame(self):
+        if not self._processing_built:
+            self._build_processing()
+            self._processing_built = True
         frames = self.pipeline.wait_for_frames()
-        aligned_frames = self.align.process(frames)
-        color_frame = aligned_frames.get_color_frame()
-        depth_frame = aligned_frames.get_depth_frame()
+        if self.filters:
+            # Filter the raw frameset before aligning, as the SDK recommends: decimation shrinks depth
+            # before the align resamples it, and the hole filters see sensor pixels, not reprojected ones
+            for depth_filter in self.filters:
+                frames = depth_filter.process(frames)
+            frames = frames.as_frameset()
+            filtered = frames.get_depth_frame()
+            if filtered:
+                filtered_intr = filtered.get_profile().as_video_stream_profile().get_intrinsics()
+                if self.align_mode == "depth" and filtered_intr.width != self.intr.width:
+                    # Color is aligned into the decimated depth geometry
+                    self._set_intrinsics(filtered_intr)
+                self._filtered_depth_intr = filtered_intr
+        if self.align is not None:
+            frames = self.align.process(frames)
+        color_frame = frames.get_color_frame()
+        depth_frame = frames.get_depth_frame()
         if not color_frame or not depth_frame:
             return None, None
-        return (np.asanyarray(color_frame.get_data()), depth_frame)
+        self.last_timestamp = self._capture_time(frames)
+        color = np.asanyarray(color_frame.get_data())
+        if self.ring_slots:
+            color = self._to_ring(color)
+        return (color, depth_frame)
+
+    def _capture_time(self, frames):
+        # Global-time and system-time stamps are epoch milliseconds; a raw hardware clock is not
+        if rs is not None and frames.get_frame_timestamp_domain() != rs.timestamp_domain.hardware_clock:
+            return frames.get_timestamp() / 1000.0
+        return time.time()
+
+    def _to_ring(self, color):
+        # The SDK owns its frame buffers, so one copy into a slot replaces a copy per consumer
+        if self.ring is None:
+            self.ring = FrameRing(color.shape, color.dtype, self.ring_slots)
+        slot, view = self.ring.acquire()
+        if slot is None or color.shape != self.ring.shape:
+            return color
+        np.copyto(view, color)
+        self.ring.commit(slot)
+        return self.ring.read(slot)
+
+    def map_boxes_to_depth(self, boxes, frame_shape, depth_shape):
+        return map_boxes_to_depth(boxes, frame_shape, depth_shape, self.align_mode,
+                                  self.color_intr, self._filtered_depth_intr)
  
+    def depth_image(self, depth_frame):
+        # uint16 view over the z16 frame buffer, valid while depth_frame is alive
+        return np.asanyarray(depth_frame.get_data())
+
+    def bearings(self, x_c, theta_r=0):
+        return lookup_bearings(self.bearing_table, x_c, theta_r)
+
+    def elevations(self, y_c):
+        return calculate_elevations(y_c, self.f_y, self.c_y)
+
     def release(self):
         self.pipeline.stop()
+        if self.ring is not None:
+            self.ring.close()
  
 
 def load_midas():
@@ -59,9 +200,86 @@ def calculate_bearing(x_c, f_x, c_x, theta_r):
     bearing = (theta_r + alpha) % 360
     return bearing
  
-def compute_average_depth(x1, y1, x2, y2, depth_frame):
+def build_bearing_table(intr):
+    # Horizontal angle of every pixel column on the principal row, through the lens distortion model
+    if rs is None:
+        # Pinhole model, ignoring lens distortion
+        return calculate_bearings(np.arange(intr.width), intr.fx, intr.ppx, 0)
+    table = np.empty(intr.width, dtype=np.float64)
+    for u in range(intr.width):
+        x, _, z = rs.rs2_deproject_pixel_to_point(intr, [float(u), intr.ppy], 1.0)
+        table[u] = math.degrees(math.atan2(x, z))
+    return table
+
+def lookup_bearings(bearing_table, x_c, theta_r=0):
+    columns = np.clip(np.asarray(x_c, dtype=np.intp), 0, len(bearing_table) - 1)
+    return (theta_r + bearing_table[columns]) % 360
+
+def map_boxes_to_depth(boxes, frame_shape, depth_shape, align_mode, color_intr, depth_intr):
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    if align_mode != "roi":
+        # Aligned streams share one geometry; only decimation changes the scale. "off" is
+        # geometry-unsafe: it uses color coordinates on the unaligned depth image as they are
+        if depth_shape[:2] == frame_shape[:2]:
+            return boxes
+        sx = depth_shape[1] / float(frame_shape[1])
+        sy = depth_shape[0] / float(frame_shape[0])
+        return boxes * np.array([sx, sy, sx, sy], dtype=np.float32)
+
+    # Unaligned: carry only the box corners through the two pinhole models instead of
+    # aligning every pixel (ignores the few-centimetre color/depth baseline)
+    xs = (boxes[:, [0, 2]] - color_intr.ppx) / color_intr.fx * depth_intr.fx + depth_intr.ppx
+    ys = (boxes[:, [1, 3]] - color_intr.ppy) / color_intr.fy * depth_intr.fy + depth_intr.ppy
+    return np.stack([xs[:, 0], ys[:, 0], xs[:, 1], ys[:, 1]], axis=1)
+
+def calculate_bearings(x_c, f_x, c_x, theta_r):
+    alpha = np.degrees(np.arctan2(np.asarray(x_c, dtype=np.float64) - c_x, f_x))
+    return (theta_r + alpha) % 360
+
+def calculate_elevations(y_c, f_y, c_y):
+    return np.degrees(np.arctan2(c_y - np.asarray(y_c, dtype=np.float64), f_y))
+
+def project_to_gps(lat_1, lon_1, distances, bearings, alt_1=None, elevations=None, mode="flat"):
+    distances = np.asarray(distances, dtype=np.float64)
+    bearing_rad = np.radians(bearings)
+
+    if mode == "geodesic":
+        # Spherical direct problem: destination along a great circle
+        lat_1_rad, lon_1_rad = math.radians(lat_1), math.radians(lon_1)
+        delta = distances / EARTH_RADIUS
+        lat_2_rad = np.arcsin(math.sin(lat_1_rad) * np.cos(delta)
+                              + math.cos(lat_1_rad) * np.sin(delta) * np.cos(bearing_rad))
+        lon_2_rad = lon_1_rad + np.arctan2(np.sin(bearing_rad) * np.sin(delta) * math.cos(lat_1_rad),
+                                           np.cos(delta) - math.sin(lat_1_rad) * np.sin(lat_2_rad))
+        lat_2 = np.degrees(lat_2_rad)
+        lon_2 = (np.degrees(lon_2_rad) + 540) % 360 - 180
+    elif mode == "flat":
+        METERS_PER_LAT_DEGREE = 111139
+        lat_2 = lat_1 + distances * np.cos(bearing_rad) / METERS_PER_LAT_DEGREE
+        lon_2 = lon_1 + distances * np.sin(bearing_rad) / (METERS_PER_LAT_DEGREE * math.cos(math.radians(lat_1)))
+    else:
+        raise ValueError(f"Unknown projection mode '{mode}', expected 'flat' or 'geodesic'")
+
+    alt_2 = None
+    if alt_1 is not None:
+        alt_2 = np.full_like(distances, float(alt_1))
+        if elevations is not None:
+            # distances are along the optical axis, so the vertical offset is depth * tan(elevation)
+            alt_2 = alt_2 + distances * np.tan(np.radians(elevations))
+
+    return lat_2, lon_2, alt_2
+
+def compute_roi_depths(depth_z16, boxes, depth_scale, percentile=25, grid=12, trim=0.2):
+    # z16 value 0 marks a hole; stats skip holes and come back in metres (NaN when a box has no valid pixel)
+    stats = box_depth_stats(depth_z16, boxes, percentile=percentile, grid=grid, invalid_value=0, trim=trim)
+    for key in DEPTH_STATS:
+        stats[key] = stats[key] * depth_scale
+    return stats
+
+def compute_average_depth(x1, y1, x2, y2, depth_frame, depth_scale=None):
     if depth_frame is None:
         return None
-    u, v = (x1 + x2) // 2, (y1 + y2) // 2
-    distance = depth_frame.get_distance(u, v)
-    return distance if distance > 0 else None
\ No newline at end of file
+    if depth_scale is None:
+        depth_scale = depth_frame.get_units()
+    distance = compute_roi_depths(np.asanyarray(depth_frame.get_data()), [(x1, y1, x2, y2)], depth_scale)["median"][0]
+    return float(distance) if np.isfinite(distance) else None
\ No newline at end of file
@@ -1,36 +1,100 @@
-import torch
+import os
+import threading
 import cv2
 import numpy as np
-from transformers import DPTImageProcessor, DPTForDepthEstimation
-from PIL import Image
-from transformers import DPTImageProcessor, DPTForDepthEstimation
 
-processor = DPTImageProcessor.from_pretrained("Intel/dpt-swinv2-tiny-256")
-model = DPTForDepthEstimation.from_pretrained("Intel/dpt-swinv2-tiny-256")
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-model.to(device)
-model.eval()
+MODEL_NAME = "Intel/dpt-swinv2-tiny-256"
+ONNX_PATH = "dpt-swinv2-tiny-256.onnx"
+BACKENDS = ("torch", "onnx")
 
-def estimate_depth(frame, point):
+# torch, PIL and transformers are imported on first use so importing this module stays cheap
+device = None
+processor = None
+model = None
+_model_lock = threading.Lock()
+_backend = "torch"
+_int8 = False
+_num_threads = 0
+
+def set_backend(backend="torch", int8=False, num_threads=0):
+    global model, _backend, _int8, _num_threads
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {list(BACKENDS)}")
+    with _model_lock:
+        _backend, _int8, _num_threads = backend, int8, num_threads
+        model = None
+
+def load_model():
+    # Deferred until first use: the download and weight load take seconds
+    global processor, model
+    if model is None:
+        with _model_lock:
+            if model is None:
+                from transformers import DPTImageProcessor
+                processor = DPTImageProcessor.from_pretrained(MODEL_NAME)
+                model = _load_onnx(processor) if _backend == "onnx" else _load_torch()
+    return processor, model
+
+def _load_torch():
+    global device
+    import torch
+    from transformers import DPTForDepthEstimation
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    dpt = DPTForDepthEstimation.from_pretrained(MODEL_NAME)
+    dpt.to(device)
+    dpt.eval()
+    return dpt
+
+def _load_onnx(processor):
+    from onnx_backend import OnnxSession, export_dpt
+    onnx_path = ONNX_PATH
+    if not os.path.exists(onnx_path):
+        # Export traces the CPU model once at the processor's fixed input size
+        from PIL import Image
+        from transformers import DPTForDepthEstimation
+        dpt = DPTForDepthEstimation.from_pretrained(MODEL_NAME).eval()
+        dummy = Image.fromarray(np.zeros((480, 640, 3), dtype=np.uint8))
+        pixel_values = processor(images=dummy, return_tensors="pt")["pixel_values"]
+        export_dpt(dpt, pixel_values, onnx_path)
+    if _int8:
+        from onnx_backend import quantize_int8
+        onnx_path = quantize_int8(onnx_path)
+    return OnnxSession(onnx_path, num_threads=_num_threads)
+
+def warmup(shape=(480, 640, 3), runs=1):
+    frame = np.zeros(shape, dtype=np.uint8)
+    for _ in range(runs):
+        estimate_depth_map(frame)
 
+def estimate_depth_map(frame):
+    # Depth at model resolution; callers map boxes into it instead of upsampling every frame
+    from PIL import Image
+    processor, model = load_model()
     img = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
     pil = Image.fromarray(img)
 
+    if _backend == "onnx":
+        pixel_values = processor(images=pil, return_tensors="np")["pixel_values"]
+        return model.run(pixel_values).squeeze()
+
+    import torch
     inputs = processor(images=pil, return_tensors="pt").to(device)
 
     with torch.no_grad():
         outputs = model(**inputs)
         pred_depth = outputs.predicted_depth 
 
+    return pred_depth.squeeze().cpu().numpy()
+
+def upsample_depth(depth_map, size):
+    H, W = size
+    return cv2.resize(depth_map, (W, H), interpolation=cv2.INTER_CUBIC)
+
+def estimate_depth(frame, point):
+
     H, W = frame.shape[:2]
-    depth_resized = torch.nn.functional.interpolate(
-        pred_depth.unsqueeze(1) if pred_depth.ndim == 3 else pred_depth,
-        size=(H, W),
-        mode="bicubic",
-        align_corners=False,
-    ).squeeze().cpu().numpy()
-
-    depth_map = depth_resized
+    depth_map = upsample_depth(estimate_depth_map(frame), (H, W))
+
     x, y = map(int, point)
     x = np.clip(x, 0, W - 1)
     y = np.clip(y, 0, H - 1)
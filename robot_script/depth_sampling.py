@@ -0,0 +1,69 @@
+import warnings
+
+import numpy as np
+
+# Distance statistics returned by box_depth_stats, alongside valid_fraction
+DEPTH_STATS = ("median", "percentile", "trimmed_mean")
+
+
+def scale_boxes(boxes, frame_shape, map_shape):
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    sx = map_shape[1] / float(frame_shape[1])
+    sy = map_shape[0] / float(frame_shape[0])
+    return boxes * np.array([sx, sy, sx, sy], dtype=np.float32)
+
+
+def sample_boxes(depth_map, boxes, frame_shape=None, grid=8, margin=0.1, invalid_value=None):
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    if frame_shape is not None:
+        boxes = scale_boxes(boxes, frame_shape, depth_map.shape)
+
+    h, w = depth_map.shape[:2]
+    l, t, r, b = boxes.T
+    # Trim the box edges, which mostly hit background around the object
+    dx, dy = (r - l) * margin, (b - t) * margin
+    l, r, t, b = l + dx, r - dx, t + dy, b - dy
+
+    steps = (np.arange(grid, dtype=np.float32) + 0.5) / grid
+    xs = np.clip((l[:, None] + (r - l)[:, None] * steps).astype(np.intp), 0, w - 1)
+    ys = np.clip((t[:, None] + (b - t)[:, None] * steps).astype(np.intp), 0, h - 1)
+
+    samples = depth_map[ys[:, :, None], xs[:, None, :]].reshape(len(boxes), grid * grid).astype(np.float32)
+    if invalid_value is not None:
+        samples[samples == invalid_value] = np.nan
+    samples[~np.isfinite(samples)] = np.nan
+    return samples
+
+
+def trimmed_mean(samples, trim=0.2):
+    # NaNs sort last, so each row keeps its valid samples between the trimmed ends
+    ordered = np.sort(samples, axis=1)
+    n_valid = np.isfinite(ordered).sum(axis=1)
+    cut = np.floor(n_valid * trim).astype(np.intp)
+    idx = np.arange(ordered.shape[1])
+    keep = (idx >= cut[:, None]) & (idx < (n_valid - cut)[:, None])
+    counts = keep.sum(axis=1)
+    totals = np.where(keep, ordered, 0.0).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, totals / counts, np.nan)
+
+
+def box_depth_stats(depth_map, boxes, frame_shape=None, percentile=25, grid=8, margin=0.1, invalid_value=None,
+                    trim=0.2):
+    samples = sample_boxes(depth_map, boxes, frame_shape, grid=grid, margin=margin, invalid_value=invalid_value)
+    if len(samples) == 0:
+        empty = np.empty(0, dtype=np.float32)
+        return {"median": empty, "percentile": empty, "trimmed_mean": empty, "valid_fraction": empty}
+
+    with warnings.catch_warnings():
+        # Boxes with no valid samples come back as NaN
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        median = np.nanmedian(samples, axis=1)
+        lower = np.nanpercentile(samples, percentile, axis=1)
+
+    return {
+        "median": median,
+        "percentile": lower,
+        "trimmed_mean": trimmed_mean(samples, trim),
+        "valid_fraction": np.isfinite(samples).mean(axis=1),
+    }
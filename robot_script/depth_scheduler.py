@@ -0,0 +1,97 @@
+import logging
+import math
+import time
+
+import cv2
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+
+class DepthScheduler:
+    def __init__(self, estimate_fn, interval=1, max_age=None, motion_threshold=None, warp=True,
+                 motion_size=(64, 48)):
+        self.estimate_fn = estimate_fn
+        if interval is None and motion_threshold is None and max_age is None:
+            # Nothing would ever trigger a refresh and the first depth map would be reused forever
+            log.warning("Depth scheduler has no interval, motion threshold or max age; running depth every frame.")
+            interval = 1
+        self.interval = interval
+        self.max_age = max_age
+        self.motion_threshold = motion_threshold
+        self.warp = warp
+        self.motion_size = motion_size
+
+        self.runs = 0
+        self.reused = 0
+        self.last_motion = 0.0
+
+        self._depth = None
+        self._key_gray = None
+        self._key_time = 0.0
+        self._frames_since_key = 0
+
+    def _small_gray(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, self.motion_size, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+    def _is_due(self, now):
+        if self._depth is None:
+            return True
+        if self.interval is not None and self._frames_since_key + 1 >= self.interval:
+            return True
+        return self.max_age is not None and now - self._key_time >= self.max_age
+
+    def get_depth(self, frame):
+        now = time.monotonic()
+        due = self._is_due(now)
+        needs_motion = self.motion_threshold is not None or self.warp
+
+        gray = None
+        if needs_motion and (not due or self.interval is None or self.interval > 1):
+            gray = self._small_gray(frame)
+            if not due:
+                self.last_motion = float(np.mean(np.abs(gray - self._key_gray)))
+                due = self.motion_threshold is not None and self.last_motion > self.motion_threshold
+
+        if due:
+            self._depth = self.estimate_fn(frame)
+            self._key_gray = gray
+            self._key_time = now
+            self._frames_since_key = 0
+            self.runs += 1
+            return self._depth
+
+        self._frames_since_key += 1
+        self.reused += 1
+        if not self.warp:
+            return self._depth
+        return self._warp_depth(gray)
+
+    def _warp_depth(self, gray):
+        # Shift the keyframe depth by the global image translation since it was estimated
+        (dx, dy), _ = cv2.phaseCorrelate(self._key_gray, gray)
+        h, w = self._depth.shape[:2]
+        dx *= w / float(self.motion_size[0])
+        dy *= h / float(self.motion_size[1])
+        if abs(dx) < 0.5 and abs(dy) < 0.5:
+            return self._depth
+        shift = np.float32([[1, 0, dx], [0, 1, dy]])
+        return cv2.warpAffine(self._depth, shift, (w, h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+
+class TrackDepthSmoother:
+    def __init__(self, alpha=1.0):
+        self.alpha = alpha
+        self._values = {}
+
+    def update(self, track_id, value):
+        prev = self._values.get(track_id)
+        if value is None or not math.isfinite(value):
+            return prev
+        smoothed = value if prev is None else prev + self.alpha * (value - prev)
+        self._values[track_id] = smoothed
+        return smoothed
+
+    def prune(self, live_ids):
+        self._values = {k: v for k, v in self._values.items() if k in live_ids}
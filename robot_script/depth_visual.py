@@ -0,0 +1,63 @@
+import cv2
+import numpy as np
+
+
+class DepthVisualizer:
+    def __init__(self, colormap=cv2.COLORMAP_INFERNO, value_range=None, adapt_rate=0.05, percentiles=(2, 98)):
+        # 256-entry BGR table built once; applyColorMap then does a plain lookup per pixel
+        self.lut = cv2.applyColorMap(np.arange(256, dtype=np.uint8).reshape(256, 1), colormap)
+        self.value_range = value_range
+        self.adapt_rate = adapt_rate
+        self.percentiles = percentiles
+
+        self._lo = None
+        self._hi = None
+        self._canvas = None
+        self._clipped = None
+        self._depth_u8 = None
+        self._depth_color = None
+
+    def _update_range(self, depth_map):
+        if self.value_range is not None:
+            return self.value_range
+
+        sample = depth_map[::8, ::8]
+        # z16 uses 0 for holes; float maps use NaN/inf
+        valid = sample[sample > 0] if np.issubdtype(sample.dtype, np.integer) else sample[np.isfinite(sample)]
+        if valid.size:
+            lo, hi = np.percentile(valid, self.percentiles)
+            if self._lo is None:
+                self._lo, self._hi = float(lo), float(hi)
+            else:
+                self._lo += self.adapt_rate * (lo - self._lo)
+                self._hi += self.adapt_rate * (hi - self._hi)
+        if self._lo is None:
+            return 0.0, 1.0
+        return self._lo, self._hi
+
+    def _buffers(self, frame_shape, depth_shape):
+        h, w = frame_shape[:2]
+        if self._canvas is None or self._canvas.shape[:2] != (2 * h, w):
+            self._canvas = np.empty((2 * h, w, 3), dtype=np.uint8)
+        if self._depth_u8 is None or self._depth_u8.shape != depth_shape[:2]:
+            self._clipped = None
+            self._depth_u8 = np.empty(depth_shape[:2], dtype=np.uint8)
+            self._depth_color = np.empty(depth_shape[:2] + (3,), dtype=np.uint8)
+
+    def render(self, frame, depth_map):
+        h, w = frame.shape[:2]
+        self._buffers(frame.shape, depth_map.shape)
+        if self._clipped is None or self._clipped.dtype != depth_map.dtype:
+            self._clipped = np.empty(depth_map.shape[:2], dtype=depth_map.dtype)
+        np.copyto(self._canvas[:h], frame)
+
+        lo, hi = self._update_range(depth_map)
+        scale = 255.0 / max(hi - lo, 1e-6)
+        # Floor at lo so the affine map stays non-negative; convertScaleAbs saturates the top at 255
+        cv2.max(depth_map, lo, self._clipped)
+        cv2.convertScaleAbs(self._clipped, self._depth_u8, alpha=scale, beta=-lo * scale)
+        cv2.applyColorMap(self._depth_u8, self.lut, self._depth_color)
+
+        # Resize once, straight into the bottom half of the canvas
+        cv2.resize(self._depth_color, (w, h), dst=self._canvas[h:], interpolation=cv2.INTER_LINEAR)
+        return self._canvas
@@ -9,13 +9,13 @@ import torch
 import pyrealsense2 as rs
 import numpy as np
 import threading
-import math
 from datetime import datetime
 import firebase_admin
 from firebase_admin import credentials, db
 import time
 import uuid
 from ultralytics import YOLO
+from depth_camera import calculate_bearing, calculate_gps_coordinates
  
 class FirebaseHandler:
     def __init__(self, robot_id="go2_robot_001"):
@@ -90,23 +90,6 @@ class DepthCamera:
     def release(self):
         self.pipeline.stop()
  
-def calculate_gps_coordinates(lat_1, lon_1, distance, bearing):
-    METERS_PER_LAT_DEGREE = 111139
-    bearing_rad = math.radians(bearing)
-    lat_1_rad = math.radians(lat_1)
-    delta_lat = distance * math.cos(bearing_rad)
-    delta_lon = distance * math.sin(bearing_rad)
-    delta_lat_deg = delta_lat / METERS_PER_LAT_DEGREE
-    delta_lon_deg = delta_lon / (METERS_PER_LAT_DEGREE * math.cos(lat_1_rad))
-    lat_2 = lat_1 + delta_lat_deg
-    lon_2 = lon_1 + delta_lon_deg
-    return lat_2, lon_2
- 
-def calculate_bearing(x_c, f_x, c_x, theta_r):
-    alpha = math.degrees(math.atan2(x_c - c_x, f_x))
-    bearing = (theta_r + alpha) % 360
-    return bearing
- 
 def compute_average_depth(x1, y1, x2, y2, depth_frame):
     u, v = (x1 + x2) // 2, (y1 + y2) // 2
     distance = depth_frame.get_distance(u, v)
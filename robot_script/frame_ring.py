@@ -0,0 +1,130 @@
+import threading
+import weakref
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Rings owned by this process, so frame consumers can recognise slot views without extra plumbing
+_owned_rings = weakref.WeakSet()
+
+
+class FrameRing:
+    # Preallocated frame slots in shared memory. The owning process writes and hands out views;
+    # worker processes attach by name and read a slot the owner keeps pinned for them.
+
+    def __init__(self, shape, dtype=np.uint8, slots=8, name=None):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.slots = slots
+        self.frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.slots * self.frame_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self._base = np.frombuffer(self.shm.buf, dtype=np.uint8, count=1).ctypes.data
+
+        # Writer/reader bookkeeping lives in the owner process only
+        self.seqs = [0] * slots
+        self.timestamps = [None] * slots
+        self.pins = [0] * slots
+        self.write_seq = 0
+        self.latest = None
+        self.dropped = 0
+        self._next = 0
+        self._lock = threading.Lock()
+        if self.owner:
+            _owned_rings.add(self)
+
+    @classmethod
+    def attach(cls, spec):
+        name, shape, dtype, slots = spec
+        return cls(shape, dtype, slots, name=name)
+
+    def spec(self):
+        return self.name, self.shape, self.dtype.str, self.slots
+
+    def _flat(self, slot):
+        return np.frombuffer(self.shm.buf, dtype=self.dtype, count=self.frame_bytes // self.dtype.itemsize,
+                             offset=slot * self.frame_bytes)
+
+    def view(self, slot):
+        # Unpinned view, for writers and for attached readers whose slot the owner keeps pinned
+        return self._flat(slot).reshape(self.shape)
+
+    def acquire(self):
+        # Next free slot for the writer: not pinned by a reader and not the newest committed frame
+        with self._lock:
+            for i in range(self.slots):
+                slot = (self._next + i) % self.slots
+                if self.pins[slot] == 0 and slot != self.latest:
+                    self._next = (slot + 1) % self.slots
+                    return slot, self.view(slot)
+            self.dropped += 1
+            return None, None
+
+    def commit(self, slot, timestamp=None):
+        with self._lock:
+            self.write_seq += 1
+            self.seqs[slot] = self.write_seq
+            self.timestamps[slot] = timestamp
+            self.latest = slot
+            return self.write_seq
+
+    def read(self, slot):
+        # Returns a view that pins the slot until it and every view derived from it are released
+        with self._lock:
+            self.pins[slot] += 1
+        return self._pinned_view(slot)
+
+    def read_latest(self, after_seq=0):
+        with self._lock:
+            slot = self.latest
+            if slot is None or self.seqs[slot] <= after_seq:
+                return None, after_seq, None
+            # Pinned under the lock so the writer cannot claim the slot before the view exists
+            self.pins[slot] += 1
+            seq, timestamp = self.seqs[slot], self.timestamps[slot]
+        return self._pinned_view(slot), seq, timestamp
+
+    def _pinned_view(self, slot):
+        flat = self._flat(slot)
+        # Derived views keep flat alive, so the pin is dropped only once all of them are gone
+        weakref.finalize(flat, self._unpin, slot)
+        return flat.reshape(self.shape)
+
+    def _unpin(self, slot):
+        with self._lock:
+            self.pins[slot] -= 1
+
+    def locate(self, frame):
+        # Slot index when frame is a whole slot view of this ring, else None
+        if not isinstance(frame, np.ndarray) or frame.shape != self.shape or frame.dtype != self.dtype:
+            return None
+        if not frame.flags.c_contiguous:
+            return None
+        offset = frame.ctypes.data - self._base
+        if offset < 0 or offset % self.frame_bytes or offset // self.frame_bytes >= self.slots:
+            return None
+        return offset // self.frame_bytes
+
+    def close(self):
+        if self.owner:
+            _owned_rings.discard(self)
+            self.shm.unlink()
+        try:
+            self.shm.close()
+        except BufferError:
+            # Views are still alive somewhere; the mapping goes away with the process
+            pass
+
+
+def find_slot(frame):
+    # (ring, slot) for a whole-slot view of a ring owned by this process, else (None, None)
+    for ring in list(_owned_rings):
+        slot = ring.locate(frame)
+        if slot is not None:
+            return ring, slot
+    return None, None
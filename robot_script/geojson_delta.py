@@ -0,0 +1,75 @@
+import math
+
+from object_geojson import create_feature, create_geojson
+
+METERS_PER_LAT_DEGREE = 111139
+
+
+class GeoJSONDeltaEncoder:
+    def __init__(self, keyframe_interval=30, min_distance_m=0.5, min_altitude_m=0.5):
+        self.keyframe_interval = keyframe_interval
+        self.min_distance_m = min_distance_m
+        self.min_altitude_m = min_altitude_m
+
+        self.seq = 0
+        self.keyframe_seq = 0
+        self._sent = {}
+        self._frames_since_keyframe = 0
+        self._force_keyframe = True
+
+    def request_keyframe(self):
+        self._force_keyframe = True
+
+    def encode(self, objects):
+        current = {str(obj.get("id")): obj for obj in objects}
+
+        if self._force_keyframe or self._frames_since_keyframe >= self.keyframe_interval:
+            self._sent = current
+            self._force_keyframe = False
+            self._frames_since_keyframe = 0
+            self.seq += 1
+            self.keyframe_seq = self.seq
+            return {"type": "keyframe", "seq": self.seq, "data": create_geojson(objects)}
+
+        self._frames_since_keyframe += 1
+
+        added = [obj for key, obj in current.items() if key not in self._sent]
+        updated = [obj for key, obj in current.items()
+                   if key in self._sent and self._has_changed(self._sent[key], obj)]
+        removed = [key for key in self._sent if key not in current]
+        if not added and not updated and not removed:
+            return None
+
+        for obj in added + updated:
+            self._sent[str(obj.get("id"))] = obj
+        for key in removed:
+            del self._sent[key]
+
+        self.seq += 1
+        return {
+            "type": "delta",
+            "seq": self.seq,
+            "keyframe": self.keyframe_seq,
+            "added": [create_feature(obj) for obj in added],
+            "updated": [create_feature(obj) for obj in updated],
+            "removed": removed,
+        }
+
+    def _has_changed(self, prev, current):
+        if prev.get("label") != current.get("label"):
+            return True
+
+        prev_lat, prev_lon = prev.get("lat"), prev.get("lon")
+        lat, lon = current.get("lat"), current.get("lon")
+        if (prev_lat is None or prev_lon is None) != (lat is None or lon is None):
+            return True
+        if lat is not None and lon is not None:
+            d_lat = (lat - prev_lat) * METERS_PER_LAT_DEGREE
+            d_lon = (lon - prev_lon) * METERS_PER_LAT_DEGREE * math.cos(math.radians(lat))
+            if math.hypot(d_lat, d_lon) > self.min_distance_m:
+                return True
+
+        prev_alt, alt = prev.get("altitude"), current.get("altitude")
+        if (prev_alt is None) != (alt is None):
+            return True
+        return alt is not None and abs(alt - prev_alt) > self.min_altitude_m
@@ -1,82 +1,181 @@
 import serial
-import io
-import pynmea2
+import logging
 import threading
+import time
+
+from nmea import PARSERS, checksum_ok, parse_sentence
+from robot_logging import every
+
+log = logging.getLogger(__name__)
+
+# Longest partial line kept between reads; NMEA sentences are at most 82 bytes
+MAX_PENDING = 4096
 
 class GPSReader:
-    def __init__(self, port='/dev/ttyUSB0', baudrate=9600):
+    def __init__(self, port='/dev/ttyUSB0', baudrate=9600, probe=True, read_timeout=0.05):
         self.port = port
         self.baudrate = baudrate
+        self.read_timeout = read_timeout
 
         self.gps_lat = None
         self.gps_lon = None
         self.gps_alt = None
+        self.gps_time = None
+
+        self.fix_quality = 0
+        self.satellites = None
+        self.hdop = None
+        self.speed = None
+        self.course = None
+        self.course_time = None
+
+        self.checksum_errors = 0
+        # Bumped on every new position fix; waiters block on cond until it changes
+        self.fix_seq = 0
 
         self._connected = False 
         self._available = False  
 
         self.running = False
         self.lock = threading.Lock()
+        self.cond = threading.Condition(self.lock)
         self.thread = None
 
+        # Optional callback receiving every raw NMEA line, e.g. a SensorRecorder
+        self.on_line = None
+
+        if not probe:
+            return
         try:
             test_serial = serial.Serial(self.port, self.baudrate, timeout=1)
             test_serial.close()
             self._connected = True
-            print(f"[GPSReader] ✔ GPS device found on {self.port}")
+            log.info("GPS device found on %s", self.port)
         except serial.SerialException as e:
-            print(f"[GPSReader] ✖ No GPS device found on {self.port}: {e}")
+            log.warning("No GPS device found on %s: %s", self.port, e)
             self._connected = False
 
     def start(self):
         if not self._connected:
-            print("[GPSReader] Cannot start: GPS device not connected.")
+            log.warning("Cannot start: GPS device not connected.")
             return
         if not self.running:
             self.running = True
             self.thread = threading.Thread(target=self._gps_loop, daemon=True)
             self.thread.start()
-            print(f"🚀 GPSReader started on port {self.port} at {self.baudrate} baud.")
+            log.info("GPSReader started on port %s at %d baud.", self.port, self.baudrate)
 
     def stop(self):
         self.running = False
         if self.thread:
             self.thread.join()
-            print("🛑 GPSReader stopped.")
+            log.info("GPSReader stopped.")
 
     def _gps_loop(self):
         try:
-            ser = serial.Serial(self.port, self.baudrate, timeout=1)
-            sio = io.TextIOWrapper(io.BufferedRWPair(ser, ser))
+            ser = serial.Serial(self.port, self.baudrate, timeout=self.read_timeout)
+        except Exception as e:
+            log.error("Failed to open serial port during _gps_loop: %s", e)
+            return
+
+        pending = bytearray()
+        try:
             while self.running:
                 try:
-                    line = sio.readline()
-                    if not line:
-                        continue
-                    msg = pynmea2.parse(line)
-                    if hasattr(msg, 'latitude') and hasattr(msg, 'longitude'):
-                        with self.lock:
-                            self.gps_lat = msg.latitude
-                            self.gps_lon = msg.longitude
-                            self.gps_alt = getattr(msg, 'altitude', None)
-                            self._available = True
-                except pynmea2.ParseError:
-                    continue
+                    # Whatever the driver has buffered, or block up to read_timeout for the next byte
+                    chunk = ser.read(ser.in_waiting or 1)
                 except Exception as e:
-                    print(f"[GPSReader] Error parsing NMEA: {e}")
+                    log.warning("Error reading NMEA: %s", e, extra=every(10))
+                    time.sleep(self.read_timeout)
+                    continue
+                if not chunk:
+                    continue
+                pending += chunk
+                *lines, rest = pending.split(b"\n")
+                for line in lines:
+                    if line.strip():
+                        self._handle_line(line)
+                pending = rest if len(rest) <= MAX_PENDING else bytearray()
+        finally:
+            ser.close()
+
+    def _handle_line(self, line):
+        # Live lines arrive as bytes from the serial buffer; replayed ones as str
+        if isinstance(line, str):
+            line = line.encode("ascii", "replace")
+        line = bytes(line).strip()
+        if self.on_line is not None:
+            self.on_line(line.decode("ascii", "replace"))
+        try:
+            msg = parse_sentence(line)
         except Exception as e:
-            print(f"[GPSReader] Failed to open serial port during _gps_loop: {e}")
+            log.warning("Error parsing NMEA: %s", e, extra=every(10))
+            return
+        if msg is None:
+            if line[3:6] in PARSERS and not checksum_ok(line):
+                self.checksum_errors += 1
+                log.debug("Dropped NMEA sentence with bad checksum: %s", line, extra=every(10))
+            return
+        self._apply(msg, time.monotonic())
+
+    def _apply(self, msg, now):
+        kind = msg["type"]
+        with self.cond:
+            if kind == "GGA":
+                self.fix_quality = msg["quality"]
+                self.satellites = msg["satellites"]
+                self.hdop = msg["hdop"]
+            if msg.get("speed") is not None and msg["valid"]:
+                self.speed = msg["speed"]
+            if msg.get("course") is not None and msg["valid"]:
+                self.course = msg["course"]
+                self.course_time = now
+
+            if not msg["valid"] or msg.get("lat") is None or msg.get("lon") is None:
+                return
+            self.gps_lat = msg["lat"]
+            self.gps_lon = msg["lon"]
+            if kind == "GGA":
+                self.gps_alt = msg["alt"]
+            self.gps_time = now
+            self._available = True
+            self.fix_seq += 1
+            self.cond.notify_all()
 
     def get_location(self, timeout=2):
-        import time
-        start = time.time()
-        while time.time() - start < timeout:
-            with self.lock:
-                if self.gps_lat is not None and self.gps_lon is not None:
-                    return self.gps_lat, self.gps_lon, self.gps_alt
-            time.sleep(0.1)
+        with self.cond:
+            if self.cond.wait_for(lambda: self.gps_lat is not None and self.gps_lon is not None, timeout):
+                return self.gps_lat, self.gps_lon, self.gps_alt
         return None, None, None
 
+    def wait_for_fix(self, last_seq=None, timeout=None):
+        # Blocks until a fix newer than last_seq arrives or timeout passes; returns the current seq
+        with self.cond:
+            if last_seq is None:
+                last_seq = self.fix_seq
+            self.cond.wait_for(lambda: self.fix_seq != last_seq, timeout)
+            return self.fix_seq
+
+    def get_latest(self):
+        with self.lock:
+            return self.gps_lat, self.gps_lon, self.gps_alt, self.gps_time
+
+    def get_status(self):
+        with self.lock:
+            return {
+                "lat": self.gps_lat,
+                "lon": self.gps_lon,
+                "alt": self.gps_alt,
+                "time": self.gps_time,
+                "fix_quality": self.fix_quality,
+                "satellites": self.satellites,
+                "hdop": self.hdop,
+                "speed": self.speed,
+                "course": self.course,
+                "course_time": self.course_time,
+                "seq": self.fix_seq,
+            }
+
     def is_connected(self):
         return self._connected
 
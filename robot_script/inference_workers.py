@@ -0,0 +1,160 @@
+import logging
+import multiprocessing as mp
+import os
+import threading
+
+import numpy as np
+
+from frame_ring import FrameRing, find_slot
+from robot_logging import setup_logging
+
+log = logging.getLogger(__name__)
+
+WORKER_KINDS = ("detect", "depth")
+
+
+def _load_runner(kind, backend, int8, num_threads, warmup_runs):
+    if kind == "detect":
+        import object_detection as module
+        module.set_backend(backend, int8=int8, num_threads=num_threads)
+        module.get_model()
+        module.use_cuda_yolo()
+        run = lambda frame, options: module.detect_objects(frame, **options)
+    else:
+        import depth_estimation as module
+        module.set_backend(backend, int8=int8, num_threads=num_threads)
+        module.load_model()
+        run = lambda frame, options: module.estimate_depth_map(frame)
+
+    if warmup_runs > 0:
+        module.warmup(runs=warmup_runs)
+    return run
+
+
+def _worker_main(conn, kind, num_threads, backend, int8, warmup_runs):
+    setup_logging(os.getenv("LOG_LEVEL", "INFO"), use_queue=False)
+    import torch
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+
+    try:
+        run = _load_runner(kind, backend, int8, num_threads, warmup_runs)
+    except Exception as e:
+        conn.send(("error", repr(e)))
+        return
+    conn.send(("ready", None))
+
+    buffer = bytearray()
+    rings = {}
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+
+        shape, dtype, options, ring_slot = request
+        if ring_slot is not None:
+            # The frame is already in shared memory; the parent keeps the slot pinned until we reply
+            spec, slot = ring_slot
+            if spec[0] not in rings:
+                rings[spec[0]] = FrameRing.attach(spec)
+            frame = rings[spec[0]].view(slot)
+        else:
+            nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            if len(buffer) != nbytes:
+                buffer = bytearray(nbytes)
+            # Frames arrive as raw bytes into a reused buffer, skipping pickle on the hot path
+            conn.recv_bytes_into(buffer)
+            frame = np.frombuffer(buffer, dtype=dtype).reshape(shape)
+
+        try:
+            result = run(frame, options)
+        except Exception as e:
+            conn.send(("error", repr(e)))
+            continue
+
+        if isinstance(result, np.ndarray):
+            result = np.ascontiguousarray(result)
+            conn.send(("array", (result.shape, result.dtype.str)))
+            conn.send_bytes(memoryview(result).cast("B"))
+        else:
+            conn.send(("ok", result))
+
+    for ring in rings.values():
+        ring.close()
+
+
+class InferenceWorker:
+    def __init__(self, kind, num_threads=1, backend="torch", int8=False, warmup_runs=1):
+        if kind not in WORKER_KINDS:
+            raise ValueError(f"Unknown worker kind '{kind}', expected one of {list(WORKER_KINDS)}")
+        self.kind = kind
+        self.num_threads = num_threads
+        self.backend = backend
+        self.int8 = int8
+        self.warmup_runs = warmup_runs
+
+        self.conn = None
+        self.process = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        # spawn keeps the child free of the parent's threads, CUDA state and OpenCV handles
+        ctx = mp.get_context("spawn")
+        self.conn, child_conn = ctx.Pipe(duplex=True)
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.kind, self.num_threads, self.backend, self.int8, self.warmup_runs),
+            name=f"{self.kind}-worker",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+        status, message = self.conn.recv()
+        if status != "ready":
+            self.stop()
+            raise RuntimeError(f"{self.kind} worker failed to start: {message}")
+        log.info("%s worker started (pid %d, %d threads).", self.kind, self.process.pid, self.num_threads)
+        return self
+
+    def submit(self, frame, **options):
+        ring, slot = find_slot(frame)
+        if ring is not None:
+            # Only the slot index crosses the pipe; the caller's reference keeps the slot pinned
+            self.conn.send((frame.shape, frame.dtype.str, options, (ring.spec(), slot)))
+            return
+
+        frame = np.ascontiguousarray(frame)
+        self.conn.send((frame.shape, frame.dtype.str, options, None))
+        # send_bytes measures length along the first axis, so hand it a flat byte view
+        self.conn.send_bytes(memoryview(frame).cast("B"))
+
+    def result(self):
+        status, payload = self.conn.recv()
+        if status == "error":
+            raise RuntimeError(f"{self.kind} worker error: {payload}")
+        if status == "array":
+            shape, dtype = payload
+            return np.frombuffer(self.conn.recv_bytes(), dtype=dtype).reshape(shape)
+        return payload
+
+    def __call__(self, frame, **options):
+        with self._lock:
+            self.submit(frame, **options)
+            return self.result()
+
+    def stop(self):
+        if self.process is None:
+            return
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+        self.process = None
@@ -0,0 +1,126 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+
+import requests
+
+from robot_logging import every
+
+log = logging.getLogger(__name__)
+
+
+class LocationFix(namedtuple("LocationFix", ["lat", "lon", "alt", "source", "timestamp", "heading", "speed", "hdop"],
+                             defaults=(None, None, None))):
+    __slots__ = ()
+
+    @property
+    def age(self):
+        if self.timestamp is None:
+            return float("inf")
+        return time.monotonic() - self.timestamp
+
+    def is_valid(self):
+        return self.lat is not None and self.lon is not None
+
+
+NO_FIX = LocationFix(None, None, None, "none", None)
+
+
+class LocationProvider:
+    def __init__(self, gps=None, gps_interval=0.2, gps_max_age=5.0, heading_min_speed=0.5, heading_max_age=10.0,
+                 ip_url="http://ip-api.com/json/", ip_ttl=300.0, ip_timeout=3.0, ip_altitude=10.0):
+        self.gps = gps
+        self.gps_interval = gps_interval
+        self.gps_max_age = gps_max_age
+        # GPS course over ground is noise below this speed (m/s), so the last good heading is held instead
+        self.heading_min_speed = heading_min_speed
+        # ...but only for this long after the last course that was used
+        self.heading_max_age = heading_max_age
+        self._heading = None
+        self._heading_time = None
+
+        self.ip_url = ip_url
+        self.ip_ttl = ip_ttl
+        self.ip_timeout = ip_timeout
+        self.ip_altitude = ip_altitude
+
+        # Reused across refreshes so the IP fallback keeps its pooled keep-alive connection
+        self.session = requests.Session()
+
+        self._fix = NO_FIX
+        self._ip_fix = NO_FIX
+        self._ip_next_attempt = 0.0
+
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self._refresh_loop, daemon=True)
+            self.thread.start()
+            log.info("Location provider started.")
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join()
+        self.session.close()
+
+    def get_fix(self):
+        # A single attribute read; the refresh thread swaps in whole immutable fixes
+        return self._fix
+
+    def _refresh_loop(self):
+        seq = None
+        while self.running:
+            try:
+                self._fix = self._read_gps() or self._read_ip() or self._fix
+            except Exception as e:
+                log.warning("Location refresh failed: %s", e, extra=every(30))
+            if self.gps is not None and self.gps.is_connected():
+                # Wake as soon as the reader has a new fix; the timeout keeps the IP fallback ticking
+                seq = self.gps.wait_for_fix(seq, timeout=self.gps_max_age / 2)
+            else:
+                time.sleep(self.gps_interval)
+
+    def _read_gps(self):
+        if self.gps is None:
+            return None
+        status = self.gps.get_status()
+        lat, lon, fix_time = status["lat"], status["lon"], status["time"]
+        if lat is None or lon is None or fix_time is None:
+            return None
+        if time.monotonic() - fix_time > self.gps_max_age:
+            return None
+
+        speed, course, course_time = status["speed"], status["course"], status["course_time"]
+        if course is not None and speed is not None and speed >= self.heading_min_speed:
+            self._heading, self._heading_time = course, course_time
+        heading = self._heading
+        if self._heading_time is None or time.monotonic() - self._heading_time > self.heading_max_age:
+            heading = None
+        return LocationFix(lat, lon, status["alt"], "gps", fix_time, heading, speed, status["hdop"])
+
+    def _read_ip(self):
+        now = time.monotonic()
+        if self._ip_fix.is_valid() and self._ip_fix.age < self.ip_ttl:
+            return self._ip_fix
+        if now < self._ip_next_attempt:
+            return self._ip_fix if self._ip_fix.is_valid() else None
+
+        self._ip_next_attempt = now + min(self.ip_ttl, 30.0)
+        try:
+            data = self.session.get(self.ip_url, timeout=self.ip_timeout).json()
+        except Exception as e:
+            log.warning("IP geolocation request failed: %s", e, extra=every(60))
+            return self._ip_fix if self._ip_fix.is_valid() else None
+
+        if data.get("status") != "success":
+            log.warning("IP geolocation error: %s", data.get("message", data), extra=every(60))
+            return self._ip_fix if self._ip_fix.is_valid() else None
+
+        log.info("Using IP-based geolocation.")
+        self._ip_fix = LocationFix(data.get("lat"), data.get("lon"), self.ip_altitude, "ip", time.monotonic())
+        return self._ip_fix
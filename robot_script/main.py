@@ -1,253 +1,543 @@
 # main.py 
 
+from startup import StartupTimer, run_parallel
+import logging
+
+# Created first so the startup report includes import time
+startup_timer = StartupTimer()
+
 import cv2
+import numpy as np
 import torch
+import object_detection
 from object_detection import detect_objects, use_cuda_yolo
-from object_geojson import create_geojson
-from depth_camera import DepthCamera, compute_average_depth, calculate_bearing, calculate_gps_coordinates
+from geojson_delta import GeoJSONDeltaEncoder
+from depth_camera import DepthCamera, compute_roi_depths, project_to_gps
 from web_camera import WebcamCamera
 from socket_server import SocketServer
+from pipeline import Pipeline
+from inference_workers import InferenceWorker
+from preview_stream import PreviewStreamer, draw_annotations
+from depth_visual import DepthVisualizer
+from depth_scheduler import DepthScheduler, TrackDepthSmoother
+from depth_sampling import DEPTH_STATS, box_depth_stats
 from datetime import datetime, timezone
 import threading
-import requests
+import time
 from gps_reader import GPSReader
-from deep_sort_realtime.deepsort_tracker import DeepSort
+from location_provider import LocationProvider
+from metrics import REGISTRY, RateMeter
+from sensor_recording import ReplayCamera, ReplayClock, ReplayGPS, SensorRecorder, camera_metadata
+from tracking import create_tracker
+from robot_logging import every, setup_logging, stop_logging
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 
+log = logging.getLogger("main")
+
 HOST = os.getenv('HOST', '192.168.0.7')  
 PORT = int(os.getenv('PORT', 5000))      
 GPS_PORT = os.getenv('GPS_PORT', '/dev/ttyUSB0')
 GPS_BAUDRATE = int(os.getenv('GPS_BAUDRATE', 9600))
-
-tracker = DeepSort(max_age=30, n_init=3, max_cosine_distance=0.3)
-
-
-prev_tracked_objects = []
-gpsavailable = False
-gpsconnected = False
-
-
-def objects_changed(prev, current):
-
-    def to_keyset(objs):
-        keys = set()
-        for o in objs:
-            keys.add((
-                str(o.get("id")),
-                str(o.get("label")),
-                round(o.get("lat") or 0.0, 6),
-                round(o.get("lon") or 0.0, 6),
-                round((o.get("altitude") or 0.0), 1),
-            ))
-        return keys
-
-    return to_keyset(prev) != to_keyset(current)
+HEADING_MIN_SPEED = float(os.getenv('HEADING_MIN_SPEED', 0.5))
+HEADING_MAX_AGE = float(os.getenv('HEADING_MAX_AGE', 10.0))
+PIPELINE_MODE = os.getenv('PIPELINE_MODE', 'false').lower() in ('1', 'true', 'yes')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_QUEUE = os.getenv('LOG_QUEUE', 'true').lower() in ('1', 'true', 'yes')
+SOCKETIO_LOGGER = os.getenv('SOCKETIO_LOGGER', 'false').lower() in ('1', 'true', 'yes')
+DELTA_KEYFRAME_INTERVAL = int(os.getenv('DELTA_KEYFRAME_INTERVAL', 30))
+DELTA_MIN_DISTANCE = float(os.getenv('DELTA_MIN_DISTANCE', 0.5))
+DELTA_MIN_ALTITUDE = float(os.getenv('DELTA_MIN_ALTITUDE', 0.5))
+TRACKER_BACKEND = os.getenv('TRACKER_BACKEND', 'deepsort')
+DEEPSORT_EMBED_INTERVAL = int(os.getenv('DEEPSORT_EMBED_INTERVAL', 1))
+
+WARMUP_RUNS = int(os.getenv('WARMUP_RUNS', 1))
+INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'torch')
+ONNX_INT8 = os.getenv('ONNX_INT8', 'false').lower() in ('1', 'true', 'yes')
+ONNX_THREADS = int(os.getenv('ONNX_THREADS', 0))
+INFERENCE_WORKERS = os.getenv('INFERENCE_WORKERS', 'false').lower() in ('1', 'true', 'yes')
+DETECT_THREADS = int(os.getenv('DETECT_THREADS', 0)) or max(1, (os.cpu_count() or 2) // 2)
+DEPTH_THREADS = int(os.getenv('DEPTH_THREADS', 0)) or max(1, (os.cpu_count() or 2) // 2)
+
+tracker_options = {"embed_interval": DEEPSORT_EMBED_INTERVAL} if TRACKER_BACKEND == "deepsort" else {}
+# Created during startup alongside the other components
+tracker = None
+detector = detect_objects
+workers = []
+
+DEPTH_INTERVAL = int(os.getenv('DEPTH_INTERVAL', 1))
+DEPTH_MOTION_THRESHOLD = float(os.getenv('DEPTH_MOTION_THRESHOLD', 0)) or None
+DEPTH_WARP = os.getenv('DEPTH_WARP', 'true').lower() in ('1', 'true', 'yes')
+DEPTH_SMOOTHING = float(os.getenv('DEPTH_SMOOTHING', 1.0))
+GEO_MODE = os.getenv('GEO_MODE', 'flat')
+DEPTH_ROI_STAT = os.getenv('DEPTH_ROI_STAT', 'median')
+if DEPTH_ROI_STAT not in DEPTH_STATS:
+    raise ValueError(f"Unknown DEPTH_ROI_STAT '{DEPTH_ROI_STAT}', expected one of {list(DEPTH_STATS)}")
+
+FRAME_RING_SLOTS = int(os.getenv('FRAME_RING_SLOTS', 0))
+
+REALSENSE_OPTIONS = {
+    "width": int(os.getenv('REALSENSE_WIDTH', 640)),
+    "height": int(os.getenv('REALSENSE_HEIGHT', 480)),
+    "fps": int(os.getenv('REALSENSE_FPS', 30)),
+    "align": os.getenv('REALSENSE_ALIGN', 'color'),
+    "decimation": int(os.getenv('REALSENSE_DECIMATION', 1)),
+    "spatial_filter": os.getenv('REALSENSE_SPATIAL_FILTER', 'false').lower() in ('1', 'true', 'yes'),
+    "temporal_filter": os.getenv('REALSENSE_TEMPORAL_FILTER', 'false').lower() in ('1', 'true', 'yes'),
+    "recording": os.getenv('REALSENSE_RECORDING') or None,
+    "ring_slots": FRAME_RING_SLOTS,
+}
+
+HEADLESS = os.getenv('HEADLESS', 'false').lower() in ('1', 'true', 'yes')
+PREVIEW_STREAM = os.getenv('PREVIEW_STREAM', 'false').lower() in ('1', 'true', 'yes')
+PREVIEW_FPS = float(os.getenv('PREVIEW_FPS', 2))
+PREVIEW_WIDTH = int(os.getenv('PREVIEW_WIDTH', 320))
+PREVIEW_QUALITY = int(os.getenv('PREVIEW_QUALITY', 70))
+
+WEBCAM_OPTIONS = {
+    "cam_index": int(os.getenv('WEBCAM_INDEX', 0)),
+    "width": int(os.getenv('WEBCAM_WIDTH', 0)) or None,
+    "height": int(os.getenv('WEBCAM_HEIGHT', 0)) or None,
+    "fps": int(os.getenv('WEBCAM_FPS', 0)) or None,
+    "fourcc": os.getenv('WEBCAM_FOURCC') or None,
+    "buffer_size": int(os.getenv('WEBCAM_BUFFER_SIZE', 1)),
+    "ring_slots": FRAME_RING_SLOTS,
+}
+
+RECORD_DIR = os.getenv('RECORD_DIR') or None
+REPLAY_DIR = os.getenv('REPLAY_DIR') or None
+REPLAY_REALTIME = os.getenv('REPLAY_REALTIME', 'true').lower() in ('1', 'true', 'yes')
+REPLAY_SPEED = float(os.getenv('REPLAY_SPEED', 1.0))
+REPLAY_LOOP = os.getenv('REPLAY_LOOP', 'false').lower() in ('1', 'true', 'yes')
+
+depth_smoother = TrackDepthSmoother(alpha=DEPTH_SMOOTHING)
+depth_visualizer = DepthVisualizer()
+# Shared by the replay camera and GPS so recorded NMEA lines follow the recorded frames
+replay_clock = ReplayClock(realtime=REPLAY_REALTIME, speed=REPLAY_SPEED) if REPLAY_DIR else None
+recorder = None
+
+STAGE_SECONDS = REGISTRY.histogram("robot_stage_seconds", "Per-frame latency of each pipeline stage", ["stage"])
+FRAMES_PUBLISHED = REGISTRY.counter("robot_frames_published_total", "Frames whose objects were published")
+FPS = REGISTRY.gauge("robot_fps", "Published frames per second, smoothed")
+TRACKED_OBJECTS = REGISTRY.gauge("robot_tracked_objects", "Objects in the last published frame, robot excluded")
+DROPPED_FRAMES = REGISTRY.counter("robot_dropped_frames_total", "Frames dropped before processing", ["source"])
+QUEUE_DEPTH = REGISTRY.gauge("robot_queue_depth", "Packets waiting in each pipeline stage inbox", ["stage"])
+LOCATION_AGE = REGISTRY.gauge("robot_location_fix_age_seconds", "Age of the current location fix")
+LOCATION_SOURCE = REGISTRY.gauge("robot_location_source", "Active location source (1 = in use)", ["source"])
+fps_meter = RateMeter()
 
 
 def initialize_camera():
 
+    if REPLAY_DIR:
+        camera = ReplayCamera(REPLAY_DIR, clock=replay_clock, loop=REPLAY_LOOP)
+        log.info("Replaying %d frames from %s.", camera.count, REPLAY_DIR)
+        return camera, camera.has_depth
+
     try:
-        camera = DepthCamera()
-        print("[Camera] RealSense camera initialized.")
+        camera = DepthCamera(**REALSENSE_OPTIONS)
+        log.info("RealSense camera initialized.")
         is_depth = True
     except Exception as e:
-        print(f"[Camera] RealSense not available: {e}")
-        camera = WebcamCamera()
-        print("[Camera] Falling back to regular webcam.")
+        log.info("RealSense not available: %s", e)
+        camera = WebcamCamera(**WEBCAM_OPTIONS)
+        log.info("Falling back to regular webcam.")
         is_depth = False
     return camera, is_depth
 
 
-def get_current_location(gps, timeout=5):
-
-    if gps is not None and gpsavailable and gpsconnected:
-        try:
-            print("[Location] Using GPS data...")
-            lat, lon, alt = gps.get_location(timeout=timeout)
-            return lat, lon, alt
-        except Exception as e:
-            print("[GPS Error]", e)
-
-    try:
-        response = requests.get("http://ip-api.com/json/", timeout=3)
-        data = response.json()
-        if data.get("status") == "success":
-            print("[Location] Using IP-based geolocation...")
-            return data.get("lat"), data.get("lon"), 10.0
+@STAGE_SECONDS.time(stage="capture")
+def capture_frame(camera, location):
+    fix = location.get_fix()
+
+    frame, depth_data = camera.get_frame()
+    if frame is None:
+        if not getattr(camera, "finished", False):
+            log.warning("No frame received from camera.", extra=every(5))
+        return None
+
+    # Stamp detections with the grab time when the camera reports one, not when processing started
+    captured_at = getattr(camera, "last_timestamp", None)
+    if recorder is not None:
+        depth_z16 = camera.depth_image(depth_data) if depth_data is not None else None
+        recorder.write_frame(frame, depth_z16, captured_at)
+    if captured_at is not None:
+        Timestamp = datetime.fromtimestamp(captured_at, timezone.utc).isoformat()
+    else:
+        Timestamp = datetime.now(timezone.utc).isoformat()
+
+    return {
+        "frame": frame,
+        "depth_data": depth_data,
+        "location": fix,
+        "timestamp": Timestamp,
+    }
+
+
+@STAGE_SECONDS.time(stage="detect")
+def detect_frame(packet):
+    packet["detections"] = detector(packet["frame"], track=tracker.uses_detector_ids)
+    return packet
+
+
+@STAGE_SECONDS.time(stage="depth")
+def estimate_frame_depth(packet, camera, is_depth, depth_scheduler):
+    depth_data = packet["depth_data"]
+    if is_depth and depth_data is not None:
+        packet["depth_map"] = camera.depth_image(depth_data)
+    else:
+        packet["depth_map"] = depth_scheduler.get_depth(packet["frame"])
+    return packet
+
+
+@STAGE_SECONDS.time(stage="track")
+def track_frame(packet, camera, is_depth):
+    frame = packet["frame"]
+    depth_data = packet["depth_data"]
+    depth_map_for_sampling = packet["depth_map"]
+    fix = packet["location"]
+    CURRENT_LAT, CURRENT_LON, CURRENT_ALT = fix.lat, fix.lon, fix.alt
+    Timestamp = packet["timestamp"]
+
+    tracks = tracker.update(packet["detections"], frame=frame)
+
+    objects = [{
+        "id": "robot",
+        "label": "robot",
+        "lat": CURRENT_LAT,
+        "lon": CURRENT_LON,
+        "altitude": CURRENT_ALT,
+        "timestamp": Timestamp
+    }]
+    annotations = []
+
+    h, w = frame.shape[:2]
+
+    confirmed = []
+    for track in tracks:
+        if not track.is_confirmed():
+            continue
+
+        l, t, r, b = track.to_ltrb()
+        l = max(0, min(int(l), w - 1))
+        r = max(0, min(int(r), w - 1))
+        t = max(0, min(int(t), h - 1))
+        b = max(0, min(int(b), h - 1))
+        if r <= l or b <= t:
+            continue
+        confirmed.append((track, (l, t, r, b)))
+
+    use_sensor_depth = is_depth and depth_data is not None
+    depth_stats = None
+    if depth_map_for_sampling is not None and confirmed:
+        boxes = [box for _, box in confirmed]
+        if use_sensor_depth:
+            depth_boxes = camera.map_boxes_to_depth(boxes, (h, w), depth_map_for_sampling.shape[:2])
+            depth_stats = compute_roi_depths(depth_map_for_sampling, depth_boxes, camera.depth_scale)
         else:
-            print("[IP-API Error]", data)
-    except Exception as e:
-        print("[Location Error]", e)
-
-    return None, None, None
-
-
-def build_depth_visual(depth_map_like, target_size):
-
-    h, w = target_size
-    depth_norm = cv2.normalize(depth_map_like, None, 0, 255, cv2.NORM_MINMAX)
-    depth_uint8 = depth_norm.astype('uint8')
-    depth_colored = cv2.applyColorMap(depth_uint8, cv2.COLORMAP_INFERNO)
-    depth_colored_resized = cv2.resize(depth_colored, (w, w * depth_colored.shape[0] // depth_colored.shape[1]))
-    depth_colored_resized = cv2.resize(depth_colored_resized, (w, h))
-    return depth_colored_resized
-
-
-def main():
-    global prev_tracked_objects, gpsavailable, gpsconnected
+            depth_stats = box_depth_stats(depth_map_for_sampling, boxes, frame_shape=(h, w))
+
+    distances = [None] * len(confirmed)
+    if use_sensor_depth and depth_stats is not None:
+        distances = [
+            depth_smoother.update(track.track_id, float(depth_stats[DEPTH_ROI_STAT][i]))
+            for i, (track, _) in enumerate(confirmed)
+        ]
+
+    projected = None
+    if CURRENT_LAT is not None and CURRENT_LON is not None and use_sensor_depth and confirmed:
+        boxes = np.array([box for _, box in confirmed])
+        projected = project_to_gps(
+            CURRENT_LAT, CURRENT_LON,
+            [np.nan if d is None else d for d in distances],
+            camera.bearings((boxes[:, 0] + boxes[:, 2]) // 2, theta_r=fix.heading or 0),
+            alt_1=CURRENT_ALT,
+            elevations=camera.elevations((boxes[:, 1] + boxes[:, 3]) // 2),
+            mode=GEO_MODE,
+        )
+
+    for i, (track, (l, t, r, b)) in enumerate(confirmed):
+        track_id = track.track_id
+        label = track.get_det_class() or "object"
+
+        distance = distances[i]
+        if use_sensor_depth:
+            depth_val = distance or 0.0
+        else:
+            depth_val = float(depth_stats["median"][i]) if depth_stats is not None else None
+            depth_val = depth_smoother.update(track_id, depth_val) or 0.0
+
+        if projected is not None and distance is not None:
+            lats, lons, alts = projected
+            lat, lon = lats[i], lons[i]
+            alt = alts[i] if alts is not None else CURRENT_ALT
+            distance_text = f"Distance: {distance:.2f}m"
+        else:
+            lat, lon, alt = CURRENT_LAT, CURRENT_LON, CURRENT_ALT
+            distance_text = f"Depth: {depth_val:.2f}"
+
+        annotations.append(((l, t, r, b), label, distance_text))
+
+        objects.append({
+            "id": track_id,
+            "label": str(label),
+            "lat": float(lat) if lat is not None else None,
+            "lon": float(lon) if lon is not None else None,
+            "altitude": float(alt) if alt is not None else None,
+            "timestamp": Timestamp,
+        })
+
+    depth_smoother.prune({track.track_id for track in tracks})
+    packet["objects"] = objects
+    packet["annotations"] = annotations
+    return packet
+
+
+@STAGE_SECONDS.time(stage="publish")
+def publish_frame(packet, socket_server):
+    startup_timer.first_frame()
+    FRAMES_PUBLISHED.inc()
+    FPS.set(fps_meter.tick())
+    TRACKED_OBJECTS.set(len(packet["objects"]) - 1)
+    log.debug("Publishing %d objects", len(packet["objects"]), extra=every(1))
+    socket_server.publish_objects(packet["objects"])
+    return packet
+
+
+def show_preview(packet):
+    combined = depth_visualizer.render(packet["frame"], packet["depth_map"])
+    # Boxes go on the canvas copy so the captured frame stays clean for the preview stream
+    draw_annotations(combined, packet["annotations"])
+    cv2.imshow("Camera (top) + Depth (bottom)", combined)
+
+    return not (cv2.waitKey(1) & 0xFF == ord('q'))
+
+
+def run_serial(camera, location, is_depth, depth_scheduler, socket_server, streamer):
+    while True:
+        packet = capture_frame(camera, location)
+        if packet is None:
+            if getattr(camera, "finished", False):
+                log.info("Replay finished.")
+                break
+            continue
+
+        packet = detect_frame(packet)
+        packet = estimate_frame_depth(packet, camera, is_depth, depth_scheduler)
+        packet = track_frame(packet, camera, is_depth)
+        publish_frame(packet, socket_server)
+
+        if streamer is not None:
+            streamer.submit(packet)
+        if not HEADLESS and not show_preview(packet):
+            break
+
+
+def dropped_frames(camera, pipeline=None):
+    dropped = {"camera": getattr(camera, "dropped", 0)}
+    ring = getattr(camera, "ring", None)
+    if ring is not None:
+        dropped["frame_ring"] = ring.dropped
+    if pipeline is not None:
+        for stage in pipeline.stages:
+            if stage.inbox is not None:
+                dropped[stage.name] = stage.inbox.dropped
+    return dropped
+
+
+def register_runtime_metrics(camera, location):
+    DROPPED_FRAMES.set_function(lambda: dropped_frames(camera))
+    LOCATION_AGE.set_function(lambda: location.get_fix().age)
+
+    def location_source():
+        active = location.get_fix().source
+        return {source: int(source == active) for source in ("gps", "ip", "none")}
+    LOCATION_SOURCE.set_function(location_source)
+
+
+def run_pipeline(camera, location, is_depth, depth_scheduler, socket_server, streamer):
+    pipeline = Pipeline()
+    capture = pipeline.add_stage("capture", lambda: capture_frame(camera, location))
+    detect = pipeline.add_stage("detect", detect_frame, capture)
+    depth = pipeline.add_stage("depth", lambda p: estimate_frame_depth(p, camera, is_depth, depth_scheduler), detect)
+    track = pipeline.add_stage("track", lambda p: track_frame(p, camera, is_depth), depth)
+    pipeline.add_stage("publish", lambda p: publish_frame(p, socket_server), track)
+    if streamer is not None:
+        pipeline.add_stage("preview-stream", streamer.submit, track)
+
+    DROPPED_FRAMES.set_function(lambda: dropped_frames(camera, pipeline))
+    QUEUE_DEPTH.set_function(
+        lambda: {stage.name: len(stage.inbox) for stage in pipeline.stages if stage.inbox is not None}
+    )
+
+    # cv2.imshow must stay on the main thread, so the preview reads its own latest-frame queue here
+    preview = track.subscribe() if not HEADLESS else None
+
+    pipeline.start()
+    try:
+        while pipeline.is_running():
+            if getattr(camera, "finished", False):
+                log.info("Replay finished.")
+                break
+            if preview is None:
+                time.sleep(0.5)
+                continue
+            packet = preview.get(timeout=0.1)
+            if packet is None:
+                continue
+            if not show_preview(packet):
+                break
+    finally:
+        pipeline.stop()
 
 
-    socket_server = SocketServer(host=HOST, port=PORT)
+def start_socket_server():
+    delta_encoder = GeoJSONDeltaEncoder(
+        keyframe_interval=DELTA_KEYFRAME_INTERVAL,
+        min_distance_m=DELTA_MIN_DISTANCE,
+        min_altitude_m=DELTA_MIN_ALTITUDE,
+    )
+    socket_server = SocketServer(host=HOST, port=PORT, delta_encoder=delta_encoder,
+                                 sio_logger=SOCKETIO_LOGGER, engineio_logger=SOCKETIO_LOGGER)
     threading.Thread(target=socket_server.run, daemon=True).start()
+    return socket_server
 
 
+def start_location():
+    if REPLAY_DIR:
+        gps = ReplayGPS(REPLAY_DIR, replay_clock)
+        if gps.is_connected():
+            gps.start()
+        else:
+            log.info("No NMEA log in the recording, using IP-based geolocation only.")
+            gps = None
+        location = LocationProvider(gps, heading_min_speed=HEADING_MIN_SPEED, heading_max_age=HEADING_MAX_AGE)
+        location.start()
+        return gps, location
+
     gps = None
     try:
         gps = GPSReader(port=GPS_PORT, baudrate=GPS_BAUDRATE)
-        threading.Thread(target=gps.start, daemon=True).start()
+        if gps.is_connected():
+            gps.start()
+        else:
+            log.info("GPS not connected, using IP-based geolocation only.")
+            gps = None
     except Exception as e:
-        print("[GPS] Failed to start GPS reader:", e)
-
-    gpsavailable = gps.is_available() if gps else False
-    gpsconnected = gps.is_connected() if gps else False
-    if not gpsavailable or not gpsconnected:
-        print("[GPS] GPS not available or not connected.")
-        if gps:
-            gps.stop()
+        log.warning("Failed to start GPS reader: %s", e)
         gps = None
 
+    location = LocationProvider(gps, heading_min_speed=HEADING_MIN_SPEED, heading_max_age=HEADING_MAX_AGE)
+    location.start()
+    return gps, location
+
 
-    print("CUDA available:", torch.cuda.is_available())
+def start_camera():
+    camera, is_depth = initialize_camera()
+    if is_depth:
+        return camera, is_depth, None
+
+    # The webcam path needs monocular depth, so its model loads here while the detector loads elsewhere
+    if INFERENCE_WORKERS:
+        estimate_fn = InferenceWorker("depth", num_threads=DEPTH_THREADS, backend=INFERENCE_BACKEND,
+                                      int8=ONNX_INT8, warmup_runs=WARMUP_RUNS).start()
+        workers.append(estimate_fn)
+    else:
+        import depth_estimation
+        depth_estimation.set_backend(INFERENCE_BACKEND, int8=ONNX_INT8, num_threads=ONNX_THREADS)
+        depth_estimation.load_model()
+        if WARMUP_RUNS > 0:
+            depth_estimation.warmup(runs=WARMUP_RUNS)
+        estimate_fn = depth_estimation.estimate_depth_map
+    depth_scheduler = DepthScheduler(
+        estimate_fn,
+        interval=DEPTH_INTERVAL or None,
+        motion_threshold=DEPTH_MOTION_THRESHOLD,
+        warp=DEPTH_WARP,
+    )
+    return camera, is_depth, depth_scheduler
+
+
+def start_detector():
+    log.info("CUDA available: %s", torch.cuda.is_available())
     if torch.cuda.is_available():
         try:
-            print("GPU:", torch.cuda.get_device_name(0))
+            log.info("GPU: %s", torch.cuda.get_device_name(0))
         except Exception:
             pass
 
-    camera, is_depth = initialize_camera()
-
-    estimate_depth = None
-    if not is_depth:
-        from depth_estimation import estimate_depth  
-
-    skip_count = 0
-    MAX_SKIPS = 5 
-
-    try:
-        while True:
-            CURRENT_LAT, CURRENT_LON, CURRENT_ALT = get_current_location(gps)
-            Timestamp = datetime.now(timezone.utc).isoformat()
-
-            frame, depth_data = camera.get_frame()
-            if frame is None:
-                print("[ERROR] No frame received from camera.")
-                continue
-
-
-            detections = detect_objects(frame)
-
-            deep_sort_inputs = []
-            for det in detections:
-                x1, y1, x2, y2 = det["bbox"]
-                conf = float(det.get("confidence", 0.0))
-                cls_name = det.get("label", "object")
-                deep_sort_inputs.append(((x1, y1, x2, y2), conf, cls_name))
-
-            tracks = tracker.update_tracks(deep_sort_inputs, frame=frame)
-
-
-            if is_depth and depth_data is not None:
-                depth_for_vis = depth_data
-                depth_map_for_sampling = depth_data
-            else:
-                _, depth_map = estimate_depth(frame, (0, 0))
-                depth_for_vis = depth_map
-                depth_map_for_sampling = depth_map
-
-
-            objects = [{
-                "id": "robot",
-                "label": "robot",
-                "lat": CURRENT_LAT,
-                "lon": CURRENT_LON,
-                "altitude": CURRENT_ALT,
-                "timestamp": Timestamp
-            }]
-
-
-            h, w = frame.shape[:2]
-            dh, dw = depth_map_for_sampling
-            h, w = frame.shape[:2]
-            dh, dw = depth_map_for_sampling.shape[:2] if depth_map_for_sampling is not None else (h, w)
-
-            for track in tracks:
-                if not track.is_confirmed():
-                    continue
-
-                track_id = track.track_id
-                l, t, r, b = track.to_ltrb()
-                l = max(0, min(int(l), w - 1))
-                r = max(0, min(int(r), w - 1))
-                t = max(0, min(int(t), h - 1))
-                b = max(0, min(int(b), h - 1))
-                if r <= l or b <= t:
-                    continue
-
-                center_x = (l + r) // 2
-                center_y = (t + b) // 2
-
-                label = track.get_det_class() or "object"
-
-                sx = int(center_x * (dw / float(w)))
-                sy = int(center_y * (dh / float(h)))
-                sx = max(0, min(sx, dw - 1))
-                sy = max(0, min(sy, dh - 1))
-
-                depth_val = float(depth_map_for_sampling[sy, sx]) if depth_map_for_sampling is not None else 0.0
-
-                if CURRENT_LAT is not None and CURRENT_LON is not None and is_depth and depth_data is not None:
-                    distance = float(compute_average_depth(l, t, r, b, depth_data))
-                    bearing = float(calculate_bearing(center_x, camera.f_x, camera.c_x, 0))
-                    lat, lon, alt = calculate_gps_coordinates(CURRENT_LAT, CURRENT_LON, distance, bearing)
-                    distance_text = f"Distance: {distance:.2f}m"
-                else:
-                    lat, lon, alt = CURRENT_LAT, CURRENT_LON, CURRENT_ALT
-                    distance_text = f"Depth: {depth_val:.2f}"
-
-                pad = 4
-                cv2.rectangle(frame, (max(0, l + pad), max(0, t + pad)),
-                              (min(w - 1, r - pad), min(h - 1, b - pad)), (0, 255, 0), 2)
-                cv2.putText(frame, str(label), (l, max(0, t - 8)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 0), 2)
-                cv2.putText(frame, distance_text, (l, min(h - 5, b + 18)),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
-
-                objects.append({
-                    "id": track_id,
-                    "label": str(label),
-                    "lat": float(lat) if lat is not None else None,
-                    "lon": float(lon) if lon is not None else None,
-                    "altitude": float(alt) if alt is not None else None,
-                    "timestamp": Timestamp,
-                })
-
-
-            geojson_data = create_geojson(objects)
-            print("Sending GeoJSON data to socket server...", geojson_data, "\n")
-            socket_server.send_frame_data(geojson_data)
-            prev_tracked_objects = objects
-
+    if INFERENCE_WORKERS:
+        worker = InferenceWorker("detect", num_threads=DETECT_THREADS, backend=INFERENCE_BACKEND,
+                                 int8=ONNX_INT8, warmup_runs=WARMUP_RUNS).start()
+        workers.append(worker)
+        return worker
 
+    object_detection.set_backend(INFERENCE_BACKEND, int8=ONNX_INT8, num_threads=ONNX_THREADS)
+    object_detection.get_model()
+    use_cuda_yolo()
+    if WARMUP_RUNS > 0:
+        object_detection.warmup(runs=WARMUP_RUNS)
+    return detect_objects
 
 
-            depth_vis = build_depth_visual(depth_for_vis, (frame.shape[0], frame.shape[1]))
-            combined = cv2.vconcat([frame, depth_vis])
-            cv2.imshow("Camera (top) + Depth (bottom)", combined)
+def main():
+    global tracker, detector, recorder
+
+    setup_logging(LOG_LEVEL, use_queue=LOG_QUEUE)
+
+    results = run_parallel({
+        "socket server": start_socket_server,
+        "location": start_location,
+        "camera": start_camera,
+        "detector": start_detector,
+        "tracker": lambda: create_tracker(TRACKER_BACKEND, **tracker_options),
+    }, startup_timer)
+    startup_timer.report()
+
+    socket_server = results["socket server"]
+    gps, location = results["location"] or (None, None)
+    camera, is_depth, depth_scheduler = results["camera"] or (None, False, None)
+    tracker = results["tracker"]
+    detector = results["detector"]
+    if socket_server is None or location is None or camera is None or tracker is None or detector is None:
+        if camera is not None:
+            camera.release()
+        if location is not None:
+            location.stop()
+        if gps is not None:
+            gps.stop()
+        for worker in workers:
+            worker.stop()
+        stop_logging()
+        raise RuntimeError("Startup failed, see errors above.")
+
+    register_runtime_metrics(camera, location)
+
+    if RECORD_DIR:
+        recorder = SensorRecorder(RECORD_DIR, lambda: camera_metadata(camera), getattr(camera, "bearing_table", None))
+        if gps is not None:
+            gps.on_line = recorder.write_nmea
+        log.info("Recording to %s.", RECORD_DIR)
+
+    streamer = None
+    if PREVIEW_STREAM:
+        streamer = PreviewStreamer(socket_server, fps=PREVIEW_FPS, width=PREVIEW_WIDTH, quality=PREVIEW_QUALITY)
+        streamer.start()
+
+    pipelined = PIPELINE_MODE
+    if pipelined and REPLAY_DIR and not REPLAY_REALTIME:
+        # The latest-only stage queues drop frames, which would make a stepped replay nondeterministic
+        log.warning("Stepped replay runs serially; ignoring PIPELINE_MODE.")
+        pipelined = False
 
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
+    try:
+        if pipelined:
+            log.info("Running in pipeline mode.")
+            run_pipeline(camera, location, is_depth, depth_scheduler, socket_server, streamer)
+        else:
+            run_serial(camera, location, is_depth, depth_scheduler, socket_server, streamer)
 
     finally:
         try:
@@ -255,13 +545,21 @@ def main():
         except Exception:
             pass
         try:
+            location.stop()
             if gps:
                 gps.stop()
         except Exception:
             pass
-        cv2.destroyAllWindows()
+        if streamer is not None:
+            streamer.stop()
+        for worker in workers:
+            worker.stop()
+        if recorder is not None:
+            recorder.close()
+        if not HEADLESS:
+            cv2.destroyAllWindows()
+        stop_logging()
 
 
 if __name__ == "__main__":
-    use_cuda_yolo()
     main()
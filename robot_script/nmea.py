@@ -0,0 +1,95 @@
+KNOTS_TO_MS = 0.514444
+KMH_TO_MS = 1 / 3.6
+
+
+def checksum_ok(sentence):
+    # XOR of everything between '$' and '*'; sentences without a checksum are accepted as before
+    star = sentence.rfind(b"*")
+    if star < 0:
+        return True
+    try:
+        expected = int(sentence[star + 1:star + 3], 16)
+    except ValueError:
+        return False
+    actual = 0
+    for byte in sentence[1:star]:
+        actual ^= byte
+    return actual == expected
+
+
+def _float(field):
+    try:
+        return float(field) if field else None
+    except ValueError:
+        return None
+
+
+def _coordinate(value, hemisphere, degree_digits):
+    # ddmm.mmmm / dddmm.mmmm to signed decimal degrees
+    if not value or not hemisphere:
+        return None
+    try:
+        degrees = int(value[:degree_digits]) + float(value[degree_digits:]) / 60.0
+    except ValueError:
+        return None
+    return -degrees if hemisphere in (b"S", b"W") else degrees
+
+
+def _gga(f):
+    if len(f) < 10:
+        return None
+    quality = int(f[6]) if f[6].isdigit() else 0
+    return {
+        "type": "GGA",
+        "lat": _coordinate(f[2], f[3], 2),
+        "lon": _coordinate(f[4], f[5], 3),
+        "quality": quality,
+        "satellites": int(f[7]) if f[7].isdigit() else None,
+        "hdop": _float(f[8]),
+        "alt": _float(f[9]),
+        "valid": quality > 0,
+    }
+
+
+def _rmc(f):
+    if len(f) < 9:
+        return None
+    speed = _float(f[7])
+    return {
+        "type": "RMC",
+        "lat": _coordinate(f[3], f[4], 2),
+        "lon": _coordinate(f[5], f[6], 3),
+        "speed": speed * KNOTS_TO_MS if speed is not None else None,
+        "course": _float(f[8]),
+        "valid": f[2] == b"A",
+    }
+
+
+def _vtg(f):
+    if len(f) < 8:
+        return None
+    speed = _float(f[7])
+    # Mode indicator N (data not valid) appears from NMEA 2.3 on
+    mode = f[9][:1] if len(f) > 9 else b""
+    return {
+        "type": "VTG",
+        "course": _float(f[1]),
+        "speed": speed * KMH_TO_MS if speed is not None else None,
+        "valid": mode != b"N",
+    }
+
+
+PARSERS = {b"GGA": _gga, b"RMC": _rmc, b"VTG": _vtg}
+
+
+def parse_sentence(line):
+    # Dict of the fields we use from a raw GGA/RMC/VTG sentence (bytes) from any talker (GP, GN, GL, ...), else None
+    line = line.strip()
+    if len(line) < 7 or line[:1] != b"$":
+        return None
+    parser = PARSERS.get(line[3:6])
+    if parser is None or not checksum_ok(line):
+        return None
+    star = line.rfind(b"*")
+    body = line[1:star] if star >= 0 else line[1:]
+    return parser(body.split(b","))
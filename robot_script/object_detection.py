@@ -1,19 +1,67 @@
-from ultralytics import YOLO
-import torch
+import logging
+import numpy as np
+import queue
+import threading
+import time
+from concurrent.futures import Future
 
-model = YOLO("yolov8n.pt")
+log = logging.getLogger(__name__)
+
+MODEL_PATH = "yolov8n.pt"
+BACKENDS = ("torch", "onnx")
+
+_model = None
+_model_lock = threading.Lock()
+_backend = "torch"
+_int8 = False
+_num_threads = 0
+
+def set_backend(backend="torch", int8=False, num_threads=0):
+    global _model, _backend, _int8, _num_threads
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {list(BACKENDS)}")
+    with _model_lock:
+        _backend, _int8, _num_threads = backend, int8, num_threads
+        _model = None
+
+def get_model():
+    # Loaded on first use so importing this module stays cheap
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from ultralytics import YOLO
+                if _backend == "onnx":
+                    from onnx_backend import default_session_options, export_yolo, session_options
+                    # Ultralytics runs .onnx weights through ONNX Runtime, keeping predict/track unchanged
+                    model = YOLO(export_yolo(MODEL_PATH, int8=_int8), task="detect")
+                    # Its ORT session is built on the first call; build it now so it gets our thread count
+                    with default_session_options(session_options(_num_threads)):
+                        model.predict(source=np.zeros((640, 640, 3), dtype=np.uint8), verbose=False)
+                    _model = model
+                else:
+                    _model = YOLO(MODEL_PATH)
+    return _model
 
 def use_cuda_yolo():
+    if _backend != "torch":
+        return
+    import torch
     if torch.cuda.is_available():
-        print("Using GPU for inference")
-        model.to('cuda')
+        log.info("Using GPU for inference")
+        get_model().to('cuda')
+
+def warmup(shape=(480, 640, 3), runs=1):
+    frame = np.zeros(shape, dtype=np.uint8)
+    for _ in range(runs):
+        get_model().predict(source=frame, verbose=False, conf=0.5)
 
-def detect_objects(frame):
-    results = model.track(source=frame,verbose=False, conf=0.5)[0]
+def _parse_results(results):
+    names = get_model().names
     detections = []
 
     for box in results.boxes:
-        label = model.names[int(box.cls)]
+        label = names[int(box.cls)]
         x1, y1, x2, y2 = map(int, box.xyxy[0])
         obj_id = int(box.id.item()) if box.id is not None else -1
 
@@ -26,3 +74,95 @@ def detect_objects(frame):
         })
 
     return detections
+
+def detect_objects(frame, track=True):
+    if track:
+        results = get_model().track(source=frame,verbose=False, conf=0.5)[0]
+    else:
+        results = get_model().predict(source=frame, verbose=False, conf=0.5)[0]
+    return _parse_results(results)
+
+def detect_objects_batch(frames):
+    # Plain predict: the built-in tracker keeps one state and cannot follow frames from several cameras
+    if not frames:
+        return []
+    results = get_model().predict(source=list(frames), verbose=False, conf=0.5)
+    return [_parse_results(r) for r in results]
+
+
+class DetectionBatcher:
+    def __init__(self, max_batch=4, max_wait=0.01):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+
+        self._requests = queue.Queue()
+        # Guards the stopped flag so no request is queued after stop() has drained the queue
+        self._lock = threading.Lock()
+        self._stopped = False
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self._batch_loop, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join()
+        with self._lock:
+            self._stopped = True
+            pending = []
+            while True:
+                try:
+                    pending.append(self._requests.get_nowait())
+                except queue.Empty:
+                    break
+        for _, future in pending:
+            future.set_exception(RuntimeError("DetectionBatcher stopped"))
+
+    def submit(self, frame):
+        future = Future()
+        with self._lock:
+            if self._stopped:
+                future.set_exception(RuntimeError("DetectionBatcher stopped"))
+            else:
+                self._requests.put((frame, future))
+        return future
+
+    def detect(self, frame, timeout=None):
+        return self.submit(frame).result(timeout=timeout)
+
+    def _collect(self):
+        try:
+            batch = [self._requests.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _batch_loop(self):
+        while self.running:
+            batch = self._collect()
+            if not batch:
+                continue
+            try:
+                results = detect_objects_batch([frame for frame, _ in batch])
+            except Exception as e:
+                log.error("Batch of %d failed: %s", len(batch), e)
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), detections in zip(batch, results):
+                future.set_result(detections)
@@ -1,20 +1,21 @@
+def create_feature(obj):
+    return {
+        "type": "Feature",
+        "id": obj.get("id"),
+        "geometry": {
+            "type": "Point",
+            "coordinates": [obj["lon"], obj["lat"]],
+        },
+        "properties": {
+            "label": obj["label"],
+            "timestamp": obj["timestamp"] if "timestamp" in obj else None,
+            "altitude": obj.get("altitude", None),
+        }
+    }
+
 
 def create_geojson(objects):
     return {
         "type": "FeatureCollection",
-        "features": [
-            {
-                "type": "Feature",
-                "geometry": {
-                    "type": "Point",
-                    "coordinates": [obj["lon"], obj["lat"]],
-                },
-                "properties": {
-                    "label": obj["label"],
-                    "timestamp": obj["timestamp"] if "timestamp" in obj else None,
-                    "altitude": obj.get("altitude", None),
-                }
-            } for obj in objects
-        ]
+        "features": [create_feature(obj) for obj in objects]
     }
-
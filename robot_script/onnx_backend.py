@@ -0,0 +1,100 @@
+import contextlib
+import logging
+import os
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+
+def _int8_path(path):
+    root, ext = os.path.splitext(path)
+    return f"{root}.int8{ext}"
+
+
+def quantize_int8(onnx_path):
+    # Dynamic quantization needs no calibration set: weights become INT8, activations are quantized per batch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    output_path = _int8_path(onnx_path)
+    if not os.path.exists(output_path):
+        log.info("Quantizing %s to INT8...", onnx_path)
+        quantize_dynamic(onnx_path, output_path, weight_type=QuantType.QInt8)
+    return output_path
+
+
+def export_yolo(weights_path, imgsz=640, int8=False):
+    onnx_path = os.path.splitext(weights_path)[0] + ".onnx"
+    if not os.path.exists(onnx_path):
+        from ultralytics import YOLO
+
+        log.info("Exporting %s to ONNX...", weights_path)
+        onnx_path = YOLO(weights_path).export(format="onnx", imgsz=imgsz, dynamic=False, simplify=True)
+    return quantize_int8(onnx_path) if int8 else onnx_path
+
+
+def export_dpt(model, pixel_values, onnx_path, int8=False):
+    if not os.path.exists(onnx_path):
+        import torch
+
+        class _DepthOnly(torch.nn.Module):
+            def __init__(self, dpt):
+                super().__init__()
+                self.dpt = dpt
+
+            def forward(self, pixel_values):
+                return self.dpt(pixel_values=pixel_values).predicted_depth
+
+        log.info("Exporting depth model to %s...", onnx_path)
+        with torch.no_grad():
+            torch.onnx.export(
+                _DepthOnly(model).eval(),
+                (pixel_values,),
+                onnx_path,
+                input_names=["pixel_values"],
+                output_names=["predicted_depth"],
+                opset_version=17,
+            )
+    return quantize_int8(onnx_path) if int8 else onnx_path
+
+
+def session_options(num_threads=0):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+    return options
+
+
+@contextlib.contextmanager
+def default_session_options(options):
+    # Sessions created inside the block without their own SessionOptions get these. Ultralytics builds
+    # its ORT session with providers only, so this is how its intra-op thread count gets pinned.
+    import onnxruntime as ort
+
+    original = ort.InferenceSession
+
+    class _Session(original):
+        def __init__(self, path_or_bytes, sess_options=None, *args, **kwargs):
+            super().__init__(path_or_bytes, sess_options or options, *args, **kwargs)
+
+    ort.InferenceSession = _Session
+    try:
+        yield
+    finally:
+        ort.InferenceSession = original
+
+
+class OnnxSession:
+    def __init__(self, onnx_path, num_threads=0):
+        import onnxruntime as ort
+
+        options = session_options(num_threads)
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.path = onnx_path
+
+    def run(self, array):
+        return self.session.run(None, {self.input_name: np.ascontiguousarray(array, dtype=np.float32)})[0]
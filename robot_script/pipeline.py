@@ -0,0 +1,127 @@
+import logging
+import threading
+import time
+from collections import deque
+
+from robot_logging import every
+
+log = logging.getLogger(__name__)
+
+
+class LatestQueue:
+    def __init__(self, maxsize=1):
+        self._items = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        with self._cond:
+            self._cond.wait_for(lambda: self._items or self._closed, timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+
+class Stage:
+    def __init__(self, name, fn, inbox=None):
+        self.name = name
+        self.fn = fn
+        self.inbox = inbox
+        self.outboxes = []
+
+        self.processed = 0
+        self.errors = 0
+        self.last_latency = 0.0
+
+        self.thread = None
+
+    def subscribe(self, maxsize=1):
+        queue = LatestQueue(maxsize)
+        self.outboxes.append(queue)
+        return queue
+
+    def _run(self, stop_event):
+        while not stop_event.is_set():
+            if self.inbox is None:
+                item = None
+            else:
+                item = self.inbox.get(timeout=0.1)
+                if item is None:
+                    continue
+
+            start = time.perf_counter()
+            try:
+                result = self.fn() if self.inbox is None else self.fn(item)
+            except Exception as e:
+                self.errors += 1
+                log.error("Stage '%s' failed: %s", self.name, e, extra=every(5))
+                continue
+            self.last_latency = time.perf_counter() - start
+
+            if result is None:
+                continue
+            self.processed += 1
+            for queue in self.outboxes:
+                queue.put(result)
+
+
+class Pipeline:
+    def __init__(self):
+        self.stages = []
+        self._stop_event = threading.Event()
+
+    def add_stage(self, name, fn, upstream=None, maxsize=1):
+        inbox = upstream.subscribe(maxsize) if upstream is not None else None
+        stage = Stage(name, fn, inbox)
+        self.stages.append(stage)
+        return stage
+
+    def start(self):
+        self._stop_event.clear()
+        for stage in self.stages:
+            stage.thread = threading.Thread(
+                target=stage._run, args=(self._stop_event,), name=f"pipeline-{stage.name}", daemon=True
+            )
+            stage.thread.start()
+        log.info("Started %d stages: %s", len(self.stages), ", ".join(s.name for s in self.stages))
+
+    def stop(self, timeout=2.0):
+        self._stop_event.set()
+        for stage in self.stages:
+            for queue in stage.outboxes:
+                queue.close()
+        for stage in self.stages:
+            if stage.thread:
+                stage.thread.join(timeout=timeout)
+        log.info("Stopped.")
+
+    def is_running(self):
+        return not self._stop_event.is_set()
+
+    def stats(self):
+        return {
+            stage.name: {
+                "processed": stage.processed,
+                "errors": stage.errors,
+                "latency": stage.last_latency,
+                "dropped": stage.inbox.dropped if stage.inbox is not None else 0,
+            }
+            for stage in self.stages
+        }
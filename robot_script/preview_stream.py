@@ -0,0 +1,79 @@
+import logging
+import threading
+import time
+
+import cv2
+
+from pipeline import LatestQueue
+from robot_logging import every
+
+log = logging.getLogger(__name__)
+
+
+def draw_annotations(image, annotations, scale=1.0):
+    h, w = image.shape[:2]
+    font_scale = max(0.3, 0.6 * scale)
+    for (l, t, r, b), label, text in annotations:
+        l, t, r, b = int(l * scale), int(t * scale), int(r * scale), int(b * scale)
+        pad = max(1, int(4 * scale))
+        cv2.rectangle(image, (max(0, l + pad), max(0, t + pad)),
+                      (min(w - 1, r - pad), min(h - 1, b - pad)), (0, 255, 0), 2)
+        cv2.putText(image, str(label), (l, max(0, t - 8)), cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255, 0, 0), 2)
+        cv2.putText(image, text, (l, min(h - 5, b + 18)),
+                    cv2.FONT_HERSHEY_SIMPLEX, font_scale, (0, 255, 255), 2)
+
+
+class PreviewStreamer:
+    def __init__(self, socket_server, fps=2.0, width=320, quality=70):
+        self.socket_server = socket_server
+        self.interval = 1.0 / fps if fps > 0 else 0.0
+        self.width = width
+        self.quality = quality
+
+        self.frames_sent = 0
+        self._last_submit = 0.0
+        self._slot = LatestQueue(1)
+
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self._encode_loop, daemon=True)
+            self.thread.start()
+            log.info("Streaming %dpx JPEG preview at up to %.1f FPS.", self.width, 1.0 / self.interval if self.interval else 0)
+
+    def stop(self):
+        self.running = False
+        self._slot.close()
+        if self.thread:
+            self.thread.join()
+
+    def submit(self, packet):
+        # Cheap on the caller's thread: rate check and a reference hand-off, no pixel work
+        if not self.socket_server.has_preview_subscribers():
+            return
+        now = time.monotonic()
+        if now - self._last_submit < self.interval:
+            return
+        self._last_submit = now
+        self._slot.put((packet["frame"], packet.get("annotations", [])))
+
+    def _encode_loop(self):
+        while self.running:
+            item = self._slot.get(timeout=0.5)
+            if item is None:
+                continue
+            frame, annotations = item
+            try:
+                h, w = frame.shape[:2]
+                scale = min(1.0, self.width / float(w))
+                small = cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+                draw_annotations(small, annotations, scale)
+                ok, jpeg = cv2.imencode(".jpg", small, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+                if ok:
+                    self.socket_server.publish("preview-frame", jpeg.tobytes())
+                    self.frames_sent += 1
+            except Exception as e:
+                log.warning("Failed to encode preview frame: %s", e, extra=every(10))
@@ -0,0 +1,92 @@
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+
+
+def every(seconds):
+    # extra= for a rate-limited call site: log.info("...", n, extra=every(5))
+    return {"rate_limit": seconds}
+
+
+class RateLimitFilter(logging.Filter):
+    # Lets a call site (logger, message template, line) through at most once per its rate_limit seconds.
+    # Runs on the template before any %-formatting, so suppressed records cost almost nothing.
+
+    def __init__(self, default_interval=0.0):
+        super().__init__()
+        self.default_interval = default_interval
+        self._last = {}
+        self._suppressed = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        interval = getattr(record, "rate_limit", self.default_interval)
+        if not interval:
+            return True
+
+        key = (record.name, record.msg, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            last = self._last.get(key)
+            if last is not None and now - last < interval:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return False
+            self._last[key] = now
+            record.suppressed = self._suppressed.pop(key, 0)
+        return True
+
+
+class SuppressedCountFormatter(logging.Formatter):
+    def format(self, record):
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        return f"{text} ({suppressed} similar suppressed)" if suppressed else text
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    # The stock QueueHandler formats the message on the logging thread; this one leaves
+    # msg/args for the listener thread, so only pass arguments that are not mutated afterwards
+    def prepare(self, record):
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener = None
+
+
+def setup_logging(level="INFO", use_queue=True, stream=None):
+    global _listener
+    stop_logging()
+
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(SuppressedCountFormatter(LOG_FORMAT))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+    if use_queue:
+        # Terminal writes happen on the listener thread, off the frame loop
+        front = DeferredQueueHandler(queue.SimpleQueue())
+        _listener = logging.handlers.QueueListener(front.queue, handler, respect_handler_level=True)
+        _listener.start()
+    else:
+        front = handler
+    front.addFilter(RateLimitFilter())
+    root.addHandler(front)
+    return root
+
+
+def stop_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,250 @@
+import json
+import logging
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from depth_camera import calculate_bearings, calculate_elevations, lookup_bearings, map_boxes_to_depth
+from gps_reader import GPSReader
+
+log = logging.getLogger(__name__)
+
+META_FILE = "meta.json"
+NMEA_FILE = "nmea.log"
+BEARINGS_FILE = "bearings.npy"
+
+
+def _intr_dict(intr):
+    return {name: float(getattr(intr, name)) for name in ("width", "height", "fx", "fy", "ppx", "ppy")}
+
+
+def camera_metadata(camera):
+    # Everything replay needs to map and project boxes the way the live camera did
+    meta = {"camera": type(camera).__name__}
+    if hasattr(camera, "intr"):
+        meta.update({
+            "align": getattr(camera, "align_mode", "color"),
+            "depth_scale": float(camera.depth_scale),
+            "intr": _intr_dict(camera.intr),
+            "color_intr": _intr_dict(camera.color_intr),
+            "depth_intr": _intr_dict(camera._filtered_depth_intr),
+        })
+    return meta
+
+
+class SensorRecorder:
+    # Color and z16 frames go to fixed-size .npy chunks written through np.memmap;
+    # timestamps and intrinsics to meta.json, raw NMEA lines to a tab-separated log.
+    # camera_meta may be a callable; it is re-sampled whenever meta.json is written, because
+    # filtered depth intrinsics are only known once frames have been captured.
+
+    def __init__(self, directory, camera_meta=None, bearing_table=None, chunk_frames=300):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.chunk_frames = chunk_frames
+        self.camera_meta = camera_meta
+        self.meta = {
+            "chunk_frames": chunk_frames,
+            "color_shape": None,
+            "depth_shape": None,
+            "timestamps": [],
+        }
+        if bearing_table is not None:
+            np.save(os.path.join(directory, BEARINGS_FILE), np.asarray(bearing_table))
+
+        self.count = 0
+        self._color = None
+        self._depth = None
+        self._nmea = open(os.path.join(directory, NMEA_FILE), "a", encoding="utf-8")
+        self._nmea_lock = threading.Lock()
+
+    def _chunk_path(self, kind, index):
+        return os.path.join(self.directory, f"{kind}_{index:05d}.npy")
+
+    def _open_chunks(self, frame, depth):
+        index = self.count // self.chunk_frames
+        self._color = open_memmap(self._chunk_path("color", index), mode="w+", dtype=frame.dtype,
+                                  shape=(self.chunk_frames,) + frame.shape)
+        if depth is not None:
+            self._depth = open_memmap(self._chunk_path("depth", index), mode="w+", dtype=np.uint16,
+                                      shape=(self.chunk_frames,) + depth.shape)
+
+    def write_frame(self, frame, depth=None, timestamp=None):
+        if self.count == 0:
+            self.meta["color_shape"] = list(frame.shape)
+            self.meta["depth_shape"] = list(depth.shape) if depth is not None else None
+        slot = self.count % self.chunk_frames
+        if slot == 0:
+            self._flush()
+            self._open_chunks(frame, depth)
+
+        self._color[slot] = frame
+        if self._depth is not None and depth is not None:
+            self._depth[slot] = depth
+        self.meta["timestamps"].append(time.time() if timestamp is None else float(timestamp))
+        self.count += 1
+
+    def write_nmea(self, line):
+        with self._nmea_lock:
+            self._nmea.write(f"{time.time():.6f}\t{line.strip()}\n")
+
+    def _flush(self):
+        for chunk in (self._color, self._depth):
+            if chunk is not None:
+                chunk.flush()
+        self._color = self._depth = None
+        self.meta["count"] = self.count
+        camera_meta = self.camera_meta() if callable(self.camera_meta) else self.camera_meta
+        self.meta.update(camera_meta or {})
+        with open(os.path.join(self.directory, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(self.meta, f)
+
+    def close(self):
+        self._flush()
+        with self._nmea_lock:
+            self._nmea.close()
+        log.info("Wrote %d frames to %s", self.count, self.directory)
+
+
+class ReplayClock:
+    # Recorded-time clock shared by replay sources. Real-time mode paces frames against the wall
+    # clock; otherwise the camera advances it frame by frame and GPS lines follow synchronously.
+
+    def __init__(self, realtime=True, speed=1.0):
+        self.realtime = realtime
+        self.speed = speed
+        self.current = None
+        self._origin = None
+        self._listeners = []
+
+    def add_listener(self, fn):
+        self._listeners.append(fn)
+
+    def reset(self):
+        self._origin = None
+
+    def advance(self, t):
+        if self._origin is None:
+            self._origin = (t, time.monotonic())
+        elif self.realtime:
+            delay = self._origin[1] + (t - self._origin[0]) / self.speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        self.current = t
+        for fn in self._listeners:
+            fn(t)
+
+
+class ReplayCamera:
+    def __init__(self, directory, clock=None, loop=False):
+        with open(os.path.join(directory, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.directory = directory
+        self.meta = meta
+        self.clock = clock if clock is not None else ReplayClock()
+        self.loop = loop
+
+        self.count = meta["count"]
+        self.chunk_frames = meta["chunk_frames"]
+        self.timestamps = meta["timestamps"]
+        self.has_depth = meta.get("depth_shape") is not None and "intr" in meta
+        self.index = 0
+        self.finished = False
+        self.last_timestamp = None
+        self._chunks = {}
+
+        if self.has_depth:
+            self.align_mode = meta["align"]
+            self.depth_scale = meta["depth_scale"]
+            self.intr = SimpleNamespace(**meta["intr"])
+            self.color_intr = SimpleNamespace(**meta["color_intr"])
+            self._filtered_depth_intr = SimpleNamespace(**meta["depth_intr"])
+            self.f_x, self.c_x = self.intr.fx, self.intr.ppx
+            self.f_y, self.c_y = self.intr.fy, self.intr.ppy
+            bearings_path = os.path.join(directory, BEARINGS_FILE)
+            if os.path.exists(bearings_path):
+                self.bearing_table = np.load(bearings_path)
+            else:
+                self.bearing_table = calculate_bearings(np.arange(int(self.intr.width)), self.f_x, self.c_x, 0)
+
+    def _chunk(self, kind, index):
+        key = (kind, index)
+        if key not in self._chunks:
+            path = os.path.join(self.directory, f"{kind}_{index:05d}.npy")
+            self._chunks = {k: v for k, v in self._chunks.items() if k[1] >= index - 1}
+            self._chunks[key] = np.load(path, mmap_mode="r")
+        return self._chunks[key]
+
+    def get_frame(self):
+        if self.index >= self.count:
+            if not self.loop or self.count == 0:
+                self.finished = True
+                return None, None
+            self.index = 0
+            self.clock.reset()
+
+        chunk, slot = divmod(self.index, self.chunk_frames)
+        timestamp = self.timestamps[self.index]
+        self.clock.advance(timestamp)
+        self.index += 1
+
+        # Views into the memory-mapped chunks; pages are read on first touch
+        frame = self._chunk("color", chunk)[slot]
+        depth = self._chunk("depth", chunk)[slot] if self.has_depth else None
+        self.last_timestamp = timestamp
+        return frame, depth
+
+    def depth_image(self, depth_data):
+        return depth_data
+
+    def map_boxes_to_depth(self, boxes, frame_shape, depth_shape):
+        # Same mapping as DepthCamera, from the recorded intrinsics instead of the SDK
+        return map_boxes_to_depth(boxes, frame_shape, depth_shape, self.align_mode,
+                                  self.color_intr, self._filtered_depth_intr)
+
+    def bearings(self, x_c, theta_r=0):
+        return lookup_bearings(self.bearing_table, x_c, theta_r)
+
+    def elevations(self, y_c):
+        return calculate_elevations(y_c, self.f_y, self.c_y)
+
+    def release(self):
+        self._chunks = {}
+
+
+class ReplayGPS(GPSReader):
+    # Feeds recorded NMEA lines through GPSReader's parser as the replay clock passes their timestamps
+
+    def __init__(self, directory, clock):
+        super().__init__(port=directory, probe=False)
+        self.clock = clock
+        self._lines = []
+        path = os.path.join(directory, NMEA_FILE)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for row in f:
+                    stamp, _, line = row.rstrip("\n").partition("\t")
+                    self._lines.append((float(stamp), line))
+        self._next = 0
+        self._connected = bool(self._lines)
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.clock.add_listener(self._feed_until)
+            log.info("Replaying %d NMEA lines.", len(self._lines))
+
+    def stop(self):
+        self.running = False
+
+    def _feed_until(self, t):
+        if self._lines and self._next > 0 and t < self._lines[self._next - 1][0]:
+            # The camera looped back to the start of the recording
+            self._next = 0
+        while self.running and self._next < len(self._lines) and self._lines[self._next][0] <= t:
+            self._handle_line(self._lines[self._next][1])
+            self._next += 1
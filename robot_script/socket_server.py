@@ -1,48 +1,188 @@
 # socket_server.py
 
+import asyncio
+import logging
 import socketio
 import json
 import uvicorn
-from threading import Thread
+from threading import Lock
+from object_geojson import create_geojson
+from geojson_delta import GeoJSONDeltaEncoder
+from wire_format import encode_binary
+from metrics import REGISTRY, metrics_app
+from robot_logging import every
+
+log = logging.getLogger(__name__)
+
+OBJECTS_EVENT = "objects"
+FORMATS = ("geojson", "delta", "binary")
+PREVIEW_ROOM = "preview"
+EVENT_ROOMS = {"preview-frame": PREVIEW_ROOM}
+
+EMITTED_BYTES = REGISTRY.counter("robot_socket_emitted_bytes_total", "Payload bytes emitted to Socket.IO clients", ["event"])
+EMITTED_MESSAGES = REGISTRY.counter("robot_socket_emitted_messages_total", "Messages emitted to Socket.IO clients", ["event"])
+# Sampled from the most recently created server
+CLIENTS = REGISTRY.gauge("robot_socket_clients", "Connected Socket.IO clients by format", ["format"])
+PREVIEW_CLIENTS = REGISTRY.gauge("robot_socket_preview_clients", "Clients subscribed to the preview stream")
+COALESCED = REGISTRY.counter("robot_socket_coalesced_total", "Payloads replaced before the event loop sent them")
 
 class SocketServer:
-    def __init__(self, host='127.0.0.1', port=5000):
+    def __init__(self, host='127.0.0.1', port=5000, delta_encoder=None, metrics_path="/metrics",
+                 sio_logger=False, engineio_logger=False):
         self.host = host
         self.port = port
 
         self.sio = socketio.AsyncServer(
             cors_allowed_origins="*",
             async_mode="asgi",
-            logger=True,
-            engineio_logger=True
+            # Per-packet library logging is off unless asked for; it floods the console at frame rate
+            logger=sio_logger,
+            engineio_logger=engineio_logger
         )
-        self.app = socketio.ASGIApp(self.sio)
+        # Requests outside /socket.io/ fall through to the Prometheus endpoint
+        other_app = metrics_app(REGISTRY, metrics_path) if metrics_path else None
+        self.app = socketio.ASGIApp(self.sio, other_asgi_app=other_app)
+
+        self.sio.on("connect", self.on_connect)
+        self.sio.on("disconnect", self.on_disconnect)
+        self.sio.on("subscribe", self.on_subscribe)
+        self.sio.on("request-keyframe", self.on_request_keyframe)
+        self.sio.on("preview-subscribe", self.on_preview_subscribe)
+        self.sio.on("preview-unsubscribe", self.on_preview_unsubscribe)
+
+        # Clients receive full GeoJSON unless they subscribe to another format
+        self.subscribers = {fmt: set() for fmt in FORMATS}
+        self.delta_encoder = delta_encoder or GeoJSONDeltaEncoder()
+        self.preview_subscribers = set()
 
-        self.sio.event(self.on_connect)
-        self.sio.event(self.on_disconnect)
+        # Latest payload per event, handed from producer threads to the uvicorn loop
+        self.loop = None
+        self._wakeup = None
+        self._pending = {}
+        self._pending_lock = Lock()
+        self._flush_scheduled = False
+        self.coalesced = 0
+
+        CLIENTS.set_function(lambda: {fmt: len(members) for fmt, members in self.subscribers.items()})
+        PREVIEW_CLIENTS.set_function(lambda: len(self.preview_subscribers))
 
     async def on_connect(self, sid, environ):
-        print(f"✅ [SocketServer] Client connected: {sid}")
+        log.info("Client connected: %s", sid)
+        await self._set_format(sid, "geojson")
+
+    async def on_disconnect(self, sid, reason=None):
+        log.info("Client disconnected: %s", sid)
+        for members in self.subscribers.values():
+            members.discard(sid)
+        self.preview_subscribers.discard(sid)
+
+    async def on_subscribe(self, sid, data):
+        fmt = data.get("format", "geojson") if isinstance(data, dict) else data
+        if fmt not in self.subscribers:
+            return {"ok": False, "error": f"Unknown format: {fmt}"}
+        await self._set_format(sid, fmt)
+        log.info("Client %s subscribed to %s", sid, fmt)
+        return {"ok": True, "format": fmt}
+
+    async def on_request_keyframe(self, sid, data=None):
+        self.delta_encoder.request_keyframe()
+
+    async def on_preview_subscribe(self, sid, data=None):
+        self.preview_subscribers.add(sid)
+        await self.sio.enter_room(sid, PREVIEW_ROOM)
+        log.info("Client %s subscribed to preview", sid)
 
-    async def on_disconnect(self, sid):
-        print(f"🔌 [SocketServer] Client disconnected: {sid}")
+    async def on_preview_unsubscribe(self, sid, data=None):
+        self.preview_subscribers.discard(sid)
+        await self.sio.leave_room(sid, PREVIEW_ROOM)
+
+    def has_preview_subscribers(self):
+        return bool(self.preview_subscribers)
+
+    async def _set_format(self, sid, fmt):
+        for name, members in self.subscribers.items():
+            if name != fmt and sid in members:
+                members.discard(sid)
+                await self.sio.leave_room(sid, name)
+        self.subscribers[fmt].add(sid)
+        await self.sio.enter_room(sid, fmt)
+        if fmt == "delta":
+            self.delta_encoder.request_keyframe()
+
+    def publish(self, event, data):
+        with self._pending_lock:
+            if event in self._pending:
+                self.coalesced += 1
+                COALESCED.inc()
+            self._pending[event] = data
+            if self._flush_scheduled or self.loop is None:
+                return
+            self._flush_scheduled = True
+            loop = self.loop
+        try:
+            loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            pass
 
     def send_frame_data(self, geojson_data):
+        self.publish("object-detected", geojson_data)
+
+    def publish_objects(self, objects):
+        self.publish(OBJECTS_EVENT, objects)
+
+    async def _publisher(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            with self._pending_lock:
+                pending, self._pending = self._pending, {}
+                self._flush_scheduled = False
+            for event, data in pending.items():
+                if event == OBJECTS_EVENT:
+                    await self._emit_objects(data)
+                else:
+                    await self._emit_data(event, data, room=EVENT_ROOMS.get(event))
+
+    async def _emit_objects(self, objects):
+        # Only encode formats someone is listening to
+        if self.subscribers["geojson"]:
+            await self._emit_data("object-detected", create_geojson(objects), room="geojson")
+        if self.subscribers["delta"]:
+            message = self.delta_encoder.encode(objects)
+            if message is not None:
+                await self._emit_data("object-delta", message, room="delta")
+        if self.subscribers["binary"]:
+            await self._emit_data("object-binary", encode_binary(objects), room="binary")
+
+    async def _emit_data(self, event, data, room=None):
         try:
-            import asyncio
-            asyncio.run(self._emit_data(geojson_data))
+            payload = json.dumps(data) if isinstance(data, (dict, list)) else data
+            await self.sio.emit(event, payload, room=room)
+            EMITTED_MESSAGES.inc(event=event)
+            EMITTED_BYTES.inc(len(payload), event=event)
+            log.debug("Sent %s to %s clients.", event, room or "all", extra=every(5))
         except Exception as e:
-            print(f"❌ Failed to send frame data: {e}")
+            log.error("Emit error: %s", e, extra=every(5))
 
-    async def _emit_data(self, geojson_data):
+    async def _serve(self, server):
+        self._wakeup = asyncio.Event()
+        with self._pending_lock:
+            self.loop = asyncio.get_running_loop()
+            if self._pending:
+                self._flush_scheduled = True
+                self._wakeup.set()
+
+        publisher = asyncio.create_task(self._publisher())
         try:
-            json_string = json.dumps(geojson_data)
-            await self.sio.emit("object-detected", json_string)
-            print("📤 Sent object-detected GeoJSON to all clients.")
-        except Exception as e:
-            print(f"❌ Emit error: {e}")
+            await server.serve()
+        finally:
+            publisher.cancel()
+            with self._pending_lock:
+                self.loop = None
 
     def run(self):
-        print(f"🚀 Starting ASGI Socket.IO server on {self.host}:{self.port}")
-        # Run uvicorn server in this thread
-        uvicorn.run(self.app, host=self.host, port=self.port, log_level="info")
+        log.info("Starting ASGI Socket.IO server on %s:%s", self.host, self.port)
+        # Run uvicorn in this thread on a loop we keep a handle to, so publish() can reach it
+        level = logging.getLevelName(logging.getLogger().getEffectiveLevel()).lower()
+        config = uvicorn.Config(self.app, host=self.host, port=self.port, log_level=level, access_log=False)
+        asyncio.run(self._serve(uvicorn.Server(config)))
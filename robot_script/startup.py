@@ -0,0 +1,47 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    def __init__(self):
+        self.start_time = time.monotonic()
+        self.timings = {}
+        self._lock = threading.Lock()
+        self._first_frame_reported = False
+
+    def measure(self, name, fn, *args, **kwargs):
+        start = time.monotonic()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.timings[name] = time.monotonic() - start
+
+    def report(self):
+        for name, elapsed in sorted(self.timings.items(), key=lambda item: -item[1]):
+            log.info("%s: %.0f ms", name, elapsed * 1000)
+        log.info("Ready after %.0f ms", (time.monotonic() - self.start_time) * 1000)
+
+    def first_frame(self):
+        if self._first_frame_reported:
+            return
+        self._first_frame_reported = True
+        log.info("First detection after %.0f ms", (time.monotonic() - self.start_time) * 1000)
+
+
+def run_parallel(tasks, timer):
+    # tasks maps a component name to a zero-argument callable; failures yield None for that component
+    results = {}
+    with ThreadPoolExecutor(max_workers=len(tasks) or 1, thread_name_prefix="startup") as pool:
+        futures = {name: pool.submit(timer.measure, name, fn) for name, fn in tasks.items()}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                log.error("%s failed: %s", name, e)
+                results[name] = None
+    return results
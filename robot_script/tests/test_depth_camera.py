@@ -0,0 +1,118 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import depth_camera
+from depth_camera import DepthCamera
+
+INTR = SimpleNamespace(width=8, height=6, fx=4.0, fy=4.0, ppx=4.0, ppy=3.0)
+
+
+class FakeFrame:
+    def __init__(self, data):
+        self.data = data
+
+    def __bool__(self):
+        return True
+
+    def get_data(self):
+        return self.data
+
+    def get_profile(self):
+        return FakeStreamProfile()
+
+
+class FakeFrameset:
+    def __init__(self, color, depth):
+        self.color, self.depth = color, depth
+
+    def get_color_frame(self):
+        return self.color
+
+    def get_depth_frame(self):
+        return self.depth
+
+    def as_frameset(self):
+        return self
+
+    def get_timestamp(self):
+        return 1700000000000.0
+
+    def get_frame_timestamp_domain(self):
+        return "global_time"
+
+
+class FakeStreamProfile:
+    def as_video_stream_profile(self):
+        return self
+
+    def get_intrinsics(self):
+        return INTR
+
+
+class FakeProfile:
+    def get_stream(self, stream):
+        return FakeStreamProfile()
+
+    def get_device(self):
+        sensor = SimpleNamespace(get_depth_scale=lambda: 0.001)
+        return SimpleNamespace(first_depth_sensor=lambda: sensor)
+
+
+class FakePipeline:
+    def __init__(self):
+        self.started = self.stopped = False
+
+    def start(self, config):
+        self.started = True
+        return FakeProfile()
+
+    def wait_for_frames(self):
+        color = FakeFrame(np.full((6, 8, 3), 7, dtype=np.uint8))
+        depth = FakeFrame(np.full((6, 8), 1000, dtype=np.uint16))
+        return FakeFrameset(color, depth)
+
+    def stop(self):
+        self.stopped = True
+
+
+class Recorder:
+    # Stands in for an SDK processing block and logs the order blocks ran in
+    def __init__(self, name, calls):
+        self.name, self.calls = name, calls
+
+    def process(self, frames):
+        self.calls.append(self.name)
+        return frames
+
+
+def test_roi_mode_runs_without_the_sdk():
+    pipeline = FakePipeline()
+    camera = DepthCamera(align="roi", pipeline=pipeline)
+
+    color, depth = camera.get_frame()
+
+    assert pipeline.started
+    assert color.shape == (6, 8, 3)
+    assert camera.last_timestamp is not None
+    assert camera.depth_image(depth)[0, 0] == 1000
+    assert camera.map_boxes_to_depth([[1, 1, 3, 3]], (6, 8), (6, 8)).tolist() == [[1.0, 1.0, 3.0, 3.0]]
+    camera.release()
+    assert pipeline.stopped
+
+
+def test_injected_blocks_filter_before_align():
+    calls = []
+    camera = DepthCamera(align="color", pipeline=FakePipeline(), align_block=Recorder("align", calls),
+                         depth_filters=[Recorder("decimate", calls), Recorder("spatial", calls)])
+
+    camera.get_frame()
+
+    assert calls == ["decimate", "spatial", "align"]
+
+
+@pytest.mark.skipif(depth_camera.rs is not None, reason="pyrealsense2 is installed")
+def test_missing_sdk_is_reported_at_construction():
+    with pytest.raises(RuntimeError, match="pyrealsense2"):
+        DepthCamera(align="color", pipeline=FakePipeline())
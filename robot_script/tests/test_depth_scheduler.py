@@ -0,0 +1,32 @@
+import numpy as np
+
+from depth_scheduler import DepthScheduler
+
+
+def _frame(value):
+    return np.full((48, 64, 3), value, dtype=np.uint8)
+
+
+def test_no_trigger_falls_back_to_every_frame():
+    calls = []
+    scheduler = DepthScheduler(lambda frame: calls.append(frame) or np.zeros((48, 64), np.float32),
+                               interval=None, motion_threshold=None)
+
+    for i in range(40):
+        scheduler.get_depth(_frame(i))
+
+    assert scheduler.interval == 1
+    assert len(calls) == 40
+    assert scheduler.reused == 0
+
+
+def test_motion_only_reuses_static_frames():
+    scheduler = DepthScheduler(lambda frame: np.zeros((48, 64), np.float32),
+                               interval=None, motion_threshold=10.0, warp=False)
+
+    for _ in range(10):
+        scheduler.get_depth(_frame(0))
+    scheduler.get_depth(_frame(200))
+
+    assert scheduler.runs == 2
+    assert scheduler.reused == 9
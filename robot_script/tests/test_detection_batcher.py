@@ -0,0 +1,52 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import object_detection
+from object_detection import DetectionBatcher
+
+
+def _frame():
+    return np.zeros((32, 32, 3), dtype=np.uint8)
+
+
+def test_stop_fails_requests_that_were_never_batched():
+    batcher = DetectionBatcher()
+    futures = [batcher.submit(_frame()) for _ in range(3)]
+
+    batcher.stop()
+
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=1)
+
+
+def test_stop_fails_queued_requests_behind_a_running_batch(monkeypatch):
+    started, release = threading.Event(), threading.Event()
+
+    def slow_batch(frames):
+        started.set()
+        release.wait(5)
+        return [[] for _ in frames]
+
+    monkeypatch.setattr(object_detection, "detect_objects_batch", slow_batch)
+    batcher = DetectionBatcher(max_batch=1, max_wait=0)
+    batcher.start()
+    running = batcher.submit(_frame())
+    assert started.wait(5)
+    queued = batcher.submit(_frame())
+
+    stopper = threading.Thread(target=batcher.stop)
+    stopper.start()
+    while batcher.running:
+        time.sleep(0.001)
+    release.set()
+    stopper.join(5)
+
+    assert running.result(timeout=1) == []
+    with pytest.raises(RuntimeError):
+        queued.result(timeout=1)
+    with pytest.raises(RuntimeError):
+        batcher.submit(_frame()).result(timeout=1)
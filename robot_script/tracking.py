@@ -0,0 +1,235 @@
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class SimpleTrack:
+    def __init__(self, track_id, ltrb, det_class, confirmed=True):
+        self.track_id = str(track_id)
+        self.ltrb = ltrb
+        self.det_class = det_class
+        self.confirmed = confirmed
+
+    def is_confirmed(self):
+        return self.confirmed
+
+    def to_ltrb(self):
+        return self.ltrb
+
+    def get_det_class(self):
+        return self.det_class
+
+
+def iou(a, b):
+    l, t = max(a[0], b[0]), max(a[1], b[1])
+    r, bt = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, r - l) * max(0.0, bt - t)
+    if inter <= 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    return inter / float(area_a + area_b - inter)
+
+
+def greedy_iou_match(boxes_a, boxes_b, min_iou):
+    pairs = []
+    for i, a in enumerate(boxes_a):
+        for j, b in enumerate(boxes_b):
+            score = iou(a, b)
+            if score >= min_iou:
+                pairs.append((score, i, j))
+    pairs.sort(reverse=True)
+
+    matches, used_a, used_b = [], set(), set()
+    for _, i, j in pairs:
+        if i in used_a or j in used_b:
+            continue
+        used_a.add(i)
+        used_b.add(j)
+        matches.append((i, j))
+    return matches
+
+
+class _MotionTrack:
+    # Constant-velocity alpha-beta filter on box centre and size (a steady-state Kalman filter)
+    ALPHA = 0.6
+    BETA = 0.2
+
+    def __init__(self, track_id, ltrb, label):
+        self.track_id = track_id
+        self.label = label
+        self.state = self._to_xywh(ltrb)
+        self.velocity = [0.0, 0.0]
+        self.hits = 1
+        self.time_since_update = 0
+
+    @staticmethod
+    def _to_xywh(ltrb):
+        l, t, r, b = ltrb
+        return [(l + r) / 2.0, (t + b) / 2.0, float(r - l), float(b - t)]
+
+    def predict(self):
+        self.state[0] += self.velocity[0]
+        self.state[1] += self.velocity[1]
+        self.time_since_update += 1
+
+    def update(self, ltrb, label):
+        measured = self._to_xywh(ltrb)
+        residual = [m - s for m, s in zip(measured, self.state)]
+        self.state = [s + self.ALPHA * r for s, r in zip(self.state, residual)]
+        self.velocity[0] += self.BETA * residual[0]
+        self.velocity[1] += self.BETA * residual[1]
+        self.label = label
+        self.hits += 1
+        self.time_since_update = 0
+
+    def to_ltrb(self):
+        cx, cy, w, h = self.state
+        return (cx - w / 2.0, cy - h / 2.0, cx + w / 2.0, cy + h / 2.0)
+
+
+class IoUTracker:
+    uses_detector_ids = False
+
+    def __init__(self, max_age=30, n_init=3, min_iou=0.3):
+        self.max_age = max_age
+        self.n_init = n_init
+        self.min_iou = min_iou
+        self.tracks = []
+        self._next_id = 1
+
+    def update(self, detections, frame=None):
+        for track in self.tracks:
+            track.predict()
+
+        matched_tracks, matched_dets = set(), set()
+        for label in {det.get("label", "object") for det in detections}:
+            track_idx = [i for i, tr in enumerate(self.tracks) if tr.label == label]
+            det_idx = [j for j, det in enumerate(detections) if det.get("label", "object") == label]
+            matches = greedy_iou_match(
+                [self.tracks[i].to_ltrb() for i in track_idx],
+                [detections[j]["bbox"] for j in det_idx],
+                self.min_iou,
+            )
+            for a, b in matches:
+                i, j = track_idx[a], det_idx[b]
+                self.tracks[i].update(detections[j]["bbox"], label)
+                matched_tracks.add(i)
+                matched_dets.add(j)
+
+        for j, det in enumerate(detections):
+            if j not in matched_dets:
+                self.tracks.append(_MotionTrack(self._next_id, det["bbox"], det.get("label", "object")))
+                self._next_id += 1
+
+        self.tracks = [tr for tr in self.tracks if tr.time_since_update <= self.max_age]
+        return [
+            SimpleTrack(tr.track_id, tr.to_ltrb(), tr.label, confirmed=tr.hits >= self.n_init)
+            for tr in self.tracks
+        ]
+
+
+class UltralyticsTracker:
+    # Passes through the ids assigned by model.track, so detection must keep its built-in tracker on
+    uses_detector_ids = True
+
+    def update(self, detections, frame=None):
+        return [
+            SimpleTrack(det["id"], det["bbox"], det.get("label", "object"))
+            for det in detections
+            if det.get("id", -1) >= 0
+        ]
+
+
+class DeepSortTracker:
+    uses_detector_ids = False
+
+    def __init__(self, max_age=30, n_init=3, max_cosine_distance=0.3,
+                 embed_interval=1, confident_iou=0.7, ambiguous_iou=0.3):
+        from deep_sort_realtime.deepsort_tracker import DeepSort
+
+        self.deepsort = DeepSort(max_age=max_age, n_init=n_init, max_cosine_distance=max_cosine_distance)
+
+        # embed_interval > 1 reuses cached per-track embeddings between full refreshes
+        self.embed_interval = embed_interval
+        self.confident_iou = confident_iou
+        self.ambiguous_iou = ambiguous_iou
+        self.frame_count = 0
+        self.embeds_computed = 0
+        self.embeds_reused = 0
+        self._track_embeds = {}
+
+    def update(self, detections, frame=None):
+        # DeepSort expects [left, top, width, height] boxes
+        raw_detections = []
+        for det in detections:
+            x1, y1, x2, y2 = det["bbox"]
+            if x2 <= x1 or y2 <= y1:
+                continue
+            conf = float(det.get("confidence", 0.0))
+            raw_detections.append(([x1, y1, x2 - x1, y2 - y1], conf, det.get("label", "object")))
+
+        if self.embed_interval <= 1 or not raw_detections:
+            return self.deepsort.update_tracks(raw_detections, frame=frame)
+
+        embeds = self._amortized_embeds(raw_detections, frame)
+        tracks = self.deepsort.update_tracks(
+            raw_detections, embeds=embeds, frame=frame, others=list(range(len(raw_detections)))
+        )
+
+        live_ids = set()
+        for track in tracks:
+            live_ids.add(track.track_id)
+            if track.time_since_update == 0:
+                self._track_embeds[track.track_id] = embeds[track.get_det_supplementary()]
+        self._track_embeds = {k: v for k, v in self._track_embeds.items() if k in live_ids}
+        return tracks
+
+    def _amortized_embeds(self, raw_detections, frame):
+        self.frame_count += 1
+        refresh_all = self.frame_count % self.embed_interval == 0
+        tracks = [t for t in self.deepsort.tracker.tracks if t.is_confirmed()]
+
+        embeds = [None] * len(raw_detections)
+        needed = []
+        for j, (ltwh, _, _) in enumerate(raw_detections):
+            if refresh_all:
+                needed.append(j)
+                continue
+
+            box = (ltwh[0], ltwh[1], ltwh[0] + ltwh[2], ltwh[1] + ltwh[3])
+            scores = sorted(((iou(box, t.to_ltrb()), t.track_id) for t in tracks), reverse=True)
+            best_iou, best_id = scores[0] if scores else (0.0, None)
+            second_iou = scores[1][0] if len(scores) > 1 else 0.0
+
+            # New, ambiguous or poorly overlapping detections get a fresh embedding
+            cached = self._track_embeds.get(best_id)
+            if cached is None or best_iou < self.confident_iou or second_iou >= self.ambiguous_iou:
+                needed.append(j)
+            else:
+                embeds[j] = cached
+
+        if needed:
+            fresh = self.deepsort.generate_embeds(frame, [raw_detections[j] for j in needed])
+            for j, embed in zip(needed, fresh):
+                embeds[j] = embed
+
+        self.embeds_computed += len(needed)
+        self.embeds_reused += len(raw_detections) - len(needed)
+        return embeds
+
+
+TRACKER_BACKENDS = {
+    "deepsort": DeepSortTracker,
+    "iou": IoUTracker,
+    "ultralytics": UltralyticsTracker,
+}
+
+
+def create_tracker(backend="deepsort", **kwargs):
+    try:
+        tracker_cls = TRACKER_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown tracker backend '{backend}', expected one of {sorted(TRACKER_BACKENDS)}")
+    log.info("Using %s tracker.", backend)
+    return tracker_cls(**kwargs)
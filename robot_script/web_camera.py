@@ -1,18 +1,169 @@
 import cv2
+import logging
 import numpy as np
+import threading
+import time
+from collections import deque
+from frame_ring import FrameRing
+
+log = logging.getLogger(__name__)
 
 class WebcamCamera:
-    def __init__(self, cam_index=0):
+    def __init__(self, cam_index=0, width=None, height=None, fps=None, fourcc=None, buffer_size=1, threaded=True,
+                 ring_slots=0):
         self.cap = cv2.VideoCapture(cam_index)
+        if fourcc:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        if width:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        if height:
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if fps:
+            self.cap.set(cv2.CAP_PROP_FPS, fps)
+        if buffer_size:
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+
+        self.threaded = threaded
+        # ring_slots > 0 decodes frames into shared-memory slots that worker processes can read in place
+        self.ring_slots = ring_slots if threaded else 0
+        self.ring = None
+        self.last_timestamp = None
+        self.dropped = 0
+        self._latencies = deque(maxlen=300)
+
+        # Latest-frame slot filled by the grab thread; older frames are overwritten, never queued
+        self._frame = None
+        self._timestamp = None
+        self._seq = 0
+        self._read_seq = 0
+        self._cond = threading.Condition()
+
+        self.running = False
+        self.thread = None
+        # Set by release() when the grab thread outlives its join timeout; the thread then releases on exit
+        self._release_on_exit = False
+        if threaded:
+            self.start()
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self._grab_loop, daemon=True)
+            self.thread.start()
+
+    def _grab_loop(self):
+        try:
+            self._grab_frames()
+        finally:
+            with self._cond:
+                self.thread = None
+                release = self._release_on_exit
+            if release:
+                self._release_capture()
+
+    def _grab_frames(self):
+        while self.running:
+            if self.ring_slots:
+                ret, slot = self._read_into_ring()
+            else:
+                ret, frame = self.cap.read()
+            timestamp = time.time()
+            if not ret:
+                time.sleep(0.01)
+                continue
+            with self._cond:
+                if self._seq > self._read_seq:
+                    self.dropped += 1
+                if self.ring_slots:
+                    self._seq = self.ring.commit(slot, timestamp)
+                else:
+                    self._frame = frame
+                    self._timestamp = timestamp
+                    self._seq += 1
+                self._cond.notify_all()
 
-    def get_frame(self):
-        ret, frame = self.cap.read()
+    def _read_into_ring(self):
+        if self.ring is None:
+            ret, frame = self.cap.read()
+            if not ret:
+                return False, None
+            self.ring = FrameRing(frame.shape, frame.dtype, self.ring_slots)
+            slot, view = self.ring.acquire()
+            np.copyto(view, frame)
+            return True, slot
+
+        slot, view = self.ring.acquire()
+        if slot is None:
+            # Every slot is still held by a consumer (the ring counts the drop): take the frame off
+            # the device queue without decoding it
+            self.cap.grab()
+            return False, None
+        # The decoder writes straight into the slot when the frame size matches
+        ret, frame = self.cap.read(image=view)
         if not ret:
-            return None, None
+            return False, None
+        if frame.shape != self.ring.shape:
+            # The stream changed size and no longer fits the ring
+            self.dropped += 1
+            return False, None
+        if frame.ctypes.data != view.ctypes.data:
+            np.copyto(view, frame)
+        return True, slot
+
+    def get_frame(self, timeout=1.0):
+        if not self.threaded:
+            ret, frame = self.cap.read()
+            if not ret:
+                return None, None
+            self.last_timestamp = time.time()
+            return frame, None
+
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > self._read_seq or not self.running, timeout)
+            if self._seq == self._read_seq:
+                return None, None
+            if self.ring_slots:
+                frame, self._read_seq, timestamp = self.ring.read_latest(self._read_seq)
+            else:
+                frame, timestamp = self._frame, self._timestamp
+                self._read_seq = self._seq
+
+        self.last_timestamp = timestamp
+        self._latencies.append(time.time() - timestamp)
         return frame, None
 
+    def latency_stats(self):
+        values = sorted(self._latencies)
+        if not values:
+            return {"count": 0, "dropped": self.dropped}
+        return {
+            "count": len(values),
+            "mean": sum(values) / len(values),
+            "p50": values[len(values) // 2],
+            "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+            "max": values[-1],
+            "dropped": self.dropped,
+        }
+
     def release(self):
+        self.running = False
+        with self._cond:
+            self._cond.notify_all()
+        thread = self.thread
+        if thread:
+            thread.join(timeout=1.0)
+        with self._cond:
+            if self.thread is not None:
+                # Still blocked in cap.read(); releasing under it would crash the backend
+                log.warning("Camera grab thread did not stop within 1 s; it will release the capture on exit.")
+                self._release_on_exit = True
+                return
+        self._release_capture()
+
+    def _release_capture(self):
         self.cap.release()
+        if self.ring is not None:
+            self.ring.close()
 
     def compute_average_depth(self, x1, y1, x2, y2, depth_frame):
-        return None 
\ No newline at end of file
+        return None 
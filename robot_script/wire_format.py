@@ -0,0 +1,94 @@
+import struct
+from datetime import datetime, timezone
+
+MAGIC = b"ODB1"
+VERSION = 1
+
+# magic, version, object count, label count, epoch-millisecond timestamp
+HEADER = struct.Struct("<4sBxHHq")
+
+ROBOT_ID = 0
+UNKNOWN_ID = -1
+MISSING = -2 ** 31
+
+COORD_SCALE = 1e7
+ALT_SCALE = 100.0
+
+
+def _to_epoch_ms(timestamp):
+    if not timestamp:
+        return 0
+    return int(datetime.fromisoformat(timestamp).timestamp() * 1000)
+
+
+def _to_track_id(obj_id):
+    if obj_id == "robot":
+        return ROBOT_ID
+    try:
+        return int(obj_id)
+    except (TypeError, ValueError):
+        return UNKNOWN_ID
+
+
+def _quantize(values, scale):
+    return [MISSING if v is None else int(round(v * scale)) for v in values]
+
+
+def encode_binary(objects):
+    labels = []
+    label_codes = {}
+    codes = []
+    for obj in objects:
+        label = str(obj.get("label"))
+        if label not in label_codes:
+            label_codes[label] = len(labels)
+            labels.append(label)
+        codes.append(label_codes[label])
+
+    n = len(objects)
+    timestamp = objects[0].get("timestamp") if objects else None
+
+    parts = [HEADER.pack(MAGIC, VERSION, n, len(labels), _to_epoch_ms(timestamp))]
+    for label in labels:
+        encoded = label.encode("utf-8")[:255]
+        parts.append(struct.pack("<B", len(encoded)))
+        parts.append(encoded)
+
+    parts.append(struct.pack(f"<{n}i", *[_to_track_id(obj.get("id")) for obj in objects]))
+    parts.append(struct.pack(f"<{n}H", *codes))
+    parts.append(struct.pack(f"<{n}i", *_quantize([obj.get("lon") for obj in objects], COORD_SCALE)))
+    parts.append(struct.pack(f"<{n}i", *_quantize([obj.get("lat") for obj in objects], COORD_SCALE)))
+    parts.append(struct.pack(f"<{n}i", *_quantize([obj.get("altitude") for obj in objects], ALT_SCALE)))
+    return b"".join(parts)
+
+
+def decode_binary(payload):
+    magic, version, n, n_labels, timestamp_ms = HEADER.unpack_from(payload, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Unsupported payload: {magic!r} v{version}")
+    offset = HEADER.size
+
+    labels = []
+    for _ in range(n_labels):
+        length = payload[offset]
+        labels.append(payload[offset + 1:offset + 1 + length].decode("utf-8"))
+        offset += 1 + length
+
+    def column(fmt):
+        nonlocal offset
+        values = struct.unpack_from(f"<{n}{fmt}", payload, offset)
+        offset += struct.calcsize(f"<{n}{fmt}")
+        return values
+
+    ids, codes = column("i"), column("H")
+    lons, lats, alts = column("i"), column("i"), column("i")
+
+    timestamp = datetime.fromtimestamp(timestamp_ms / 1000, timezone.utc).isoformat() if timestamp_ms else None
+    return [{
+        "id": "robot" if ids[i] == ROBOT_ID else ids[i],
+        "label": labels[codes[i]],
+        "lat": None if lats[i] == MISSING else lats[i] / COORD_SCALE,
+        "lon": None if lons[i] == MISSING else lons[i] / COORD_SCALE,
+        "altitude": None if alts[i] == MISSING else alts[i] / ALT_SCALE,
+        "timestamp": timestamp,
+    } for i in range(n)]